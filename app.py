@@ -1,16 +1,32 @@
-from flask import Flask, jsonify, request
+from flask import Flask, jsonify, request, send_from_directory, g, after_this_request, has_request_context
 from flask_cors import CORS
-from models import db, Settings, CustomHoliday, WorkEntry
-from logic import calculate_net_hours, get_day_info, normalize_time_str, calculate_gross_time_needed
+from models import db, Settings, CustomHoliday, WorkEntry, GlzCheckpoint, ImportJob, AppState, DataRevision, ChangeLog
+from pdf_parser import parse_pdf_content, parse_pdf_bytes, count_pdf_pages, ParseCache
+from backup import start_backup_scheduler
+from storage import engine_options, configure_sqlite_engine
+import assets
+from logic import (calculate_net_hours, normalize_time_str, parse_time_minutes, net_minutes_batch, gross_minutes_needed, calculate_glz_delta,
+                   get_year_calendar, FLAG_WORKDAY, FLAG_SHORT_DAY, FLAG_OFF_DAY,
+                   CalendarHoliday, TYPE_CODES, aggregate_year)
 import os
-import shutil
-import time
 from datetime import datetime, date, timedelta
-import holidays
 import calendar
-from sqlalchemy import text, inspect
-import pdfplumber
+from array import array
+from sqlalchemy import func, insert, cast, Integer, and_, event
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 import re
+import io
+import zipfile
+import multiprocessing
+import gzip
+import hashlib
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import json
+import uuid
+import time
+from collections import namedtuple, OrderedDict, deque
+from types import MappingProxyType
+import threading
 import logging
 from logging.handlers import TimedRotatingFileHandler
 
@@ -39,32 +55,15 @@ app.logger.setLevel(logging.INFO)
 # --- DB KONFIGURATION ---
 app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{db_path}'
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options()
 db.init_app(app)
+# WAL, busy_timeout & Co. auf jeder Verbindung, bevor die erste geöffnet wird
+with app.app_context(): configure_sqlite_engine(db.engine)
 
 
 # --- 2. DATENBANK BACKUPS (Backup-Rotation) ---
-def perform_daily_backup():
-    """Erstellt einmal am Tag ein Backup der SQLite Datenbank und löscht alte Backups (>180 Tage)"""
-    today_str = datetime.now().strftime('%Y-%m-%d')
-    backup_file = os.path.join(backup_dir, f'db_backup_{today_str}.db')
-    
-    if not os.path.exists(backup_file) and os.path.exists(db_path):
-        try:
-            shutil.copy2(db_path, backup_file)
-            app.logger.info(f"Tägliches Datenbank-Backup erstellt: {backup_file}")
-            now = time.time()
-            for f in os.listdir(backup_dir):
-                f_path = os.path.join(backup_dir, f)
-                if os.path.isfile(f_path):
-                    if os.stat(f_path).st_mtime < now - (180 * 86400):
-                        os.remove(f_path)
-                        app.logger.info(f"Altes Backup gelöscht (>180 Tage): {f}")
-        except Exception as e:
-            app.logger.error(f"Fehler beim DB-Backup: {e}", exc_info=True)
-
-@app.before_request
-def before_request_hook():
-    perform_daily_backup()
+# Läuft im Hintergrund-Thread (siehe App-Startup), nie im Request-Pfad
+BACKUP_CHECK_INTERVAL = int(os.environ.get('BACKUP_CHECK_INTERVAL', 3600))
 
 
 # --- MIGRATION & HELPER ---
@@ -74,49 +73,183 @@ def migrate_x_to_planned():
             old_entries = WorkEntry.query.filter_by(type='x').all()
             if old_entries:
                 for entry in old_entries: entry.type = 'planned'
+                mark_data_changed(min(e.date for e in old_entries))
+                log_changes('work_entry', 'update', [(e.id, e.date) for e in old_entries])
                 db.session.commit()
     except Exception as e:
         app.logger.error(f"Migrations-Fehler (X->Planned): {e}")
 
-def auto_convert_expired_planned_days():
+def entry_net_hours(entry):
+    """Netto-Stunden eines Eintrags aus der gespeicherten Minuten-Spalte (Fallback: Neuberechnung)."""
+    if entry.net_minutes is not None: return round(entry.net_minutes / 60, 2)
+    return calculate_net_hours(entry.start_time, entry.end_time)
+
+# --- APP-ZUSTAND ---
+def get_app_state(key):
+    row = db.session.get(AppState, key)
+    return row.value if row else None
+
+def set_app_state(key, value):
+    """Upsert eines Zustandswerts (Commit macht der Aufrufer)."""
+    stmt = sqlite_insert(AppState).values(key=key, value=value)
+    db.session.execute(stmt.on_conflict_do_update(index_elements=['key'], set_={"value": stmt.excluded.value}))
+
+
+# --- KONFIGURATIONS-CACHE (Settings + eigene Feiertage) ---
+CONFIG_VERSION_KEY = 'config_version'
+SettingsSnapshot = namedtuple('SettingsSnapshot', ['weekly_hours', 'active_weekdays', 'active_days', 'ho_quota_percent',
+                                                   'hide_weekends', 'default_start_time', 'auto_convert_planned'])
+ConfigSnapshot = namedtuple('ConfigSnapshot', ['version', 'settings', 'custom_map', 'custom_holidays'])
+_config_snapshot = None
+
+def bump_config_version():
+    """Erhöht die Konfigurations-Version; muss im selben Commit wie die Änderung an Settings/Feiertagen laufen."""
+    stmt = sqlite_insert(AppState).values(key=CONFIG_VERSION_KEY, value='1')
+    db.session.execute(stmt.on_conflict_do_update(index_elements=['key'], set_={"value": cast(AppState.value, Integer) + 1}))
+
+def load_config_snapshot(version):
+    s = db.session.query(Settings).first()
+    active_days = tuple(int(x) for x in s.active_weekdays.split(',')) if s.active_weekdays else (0, 1, 2, 3, 4)
+    settings = SettingsSnapshot(s.weekly_hours, s.active_weekdays, active_days, s.ho_quota_percent,
+                                s.hide_weekends, s.default_start_time, s.auto_convert_planned)
+    hols = sorted(CustomHoliday.query.all(), key=lambda h: h.date)
+    custom_map = MappingProxyType({date.fromisoformat(h.date): CalendarHoliday(h.name, h.hours) for h in hols})
+    custom_holidays = tuple(MappingProxyType({'id': h.id, 'date': h.date, 'name': h.name, 'hours': h.hours or 0}) for h in hols)
+    return ConfigSnapshot(version, settings, custom_map, custom_holidays)
+
+def get_config():
+    """
+    Unveränderlicher Snapshot von Settings und eigenen Feiertagen (pro Worker-Prozess).
+    Pro Aufruf nur ein Primärschlüssel-Lookup der Version; neu geladen wird nur nach einer Änderung.
+    """
+    global _config_snapshot
+    version = get_app_state(CONFIG_VERSION_KEY)
+    snapshot = _config_snapshot
+    if snapshot is None or snapshot.version != version:
+        snapshot = _config_snapshot = load_config_snapshot(version)
+    return snapshot
+
+
+# --- ANTWORT-CACHE (Monat/Jahr) ---
+ALL_MONTHS = '0000-00'
+RESPONSE_CACHE_SIZE = int(os.environ.get('RESPONSE_CACHE_SIZE', 64))
+_response_cache = OrderedDict()
+_response_cache_lock = threading.Lock()
+
+def data_revision(through_month):
+    """Höchste Revision, die den Monat betrifft (Änderungen in diesem oder einem früheren Monat)."""
+    return db.session.query(func.max(DataRevision.seq)).filter(DataRevision.from_month <= through_month).scalar() or 0
+
+def cached_json_response(cache_key, through_month, build):
+    """
+    Liefert eine JSON-Antwort aus dem LRU-Cache, solange sich Konfiguration und Daten-Revision
+    der betroffenen Monate nicht geändert haben. Kennt der Browser den Stand schon -> 304.
+    """
+    version = (get_app_state(CONFIG_VERSION_KEY) or '0', data_revision(through_month))
+    etag = "-".join(map(str, cache_key)) + f"-c{version[0]}-r{version[1]}"
+    if etag in request.if_none_match:
+        resp = app.response_class(status=304)
+    else:
+        with _response_cache_lock:
+            hit = _response_cache.get(cache_key)
+            if hit and hit[0] == version: _response_cache.move_to_end(cache_key)
+        if hit and hit[0] == version:
+            body = hit[1]
+        else:
+            body = app.json.dumps(build())
+            with _response_cache_lock:
+                _response_cache[cache_key] = (version, body)
+                _response_cache.move_to_end(cache_key)
+                while len(_response_cache) > RESPONSE_CACHE_SIZE: _response_cache.popitem(last=False)
+        resp = app.response_class(body, mimetype='application/json')
+    resp.set_etag(etag)
+    resp.headers['Cache-Control'] = 'no-cache'
+    return resp
+
+
+# --- AUTO-KONVERTIERUNG GEPLANTER TAGE ---
+PLANNED_WATERMARK_KEY = 'planned_converted_through'
+PLANNED_TICK_INTERVAL = 600
+
+def convert_expired_planned_days(from_date=None, through_date=None):
+    """
+    Wandelt abgelaufene 'planned'-Einträge im Bereich [from_date, through_date] in Home Office um
+    (Standard-Startzeit + Soll-Bruttozeit). Bis heute exklusive; der Aufrufer committet.
+    """
+    config = get_config()
+    settings = config.settings
+    if not settings.auto_convert_planned: return 0
+
+    yesterday = datetime.now().date() - timedelta(days=1)
+    through = min(through_date, yesterday) if through_date else yesterday
+    query = WorkEntry.query.filter(WorkEntry.type == 'planned', WorkEntry.date < str(through + timedelta(days=1)))
+    if from_date is not None: query = query.filter(WorkEntry.date >= str(from_date))
+    expired_entries = query.all()
+    if not expired_entries: return 0
+
+    custom_map = config.custom_map
+    def_start = settings.default_start_time if settings.default_start_time else "08:00"
+
+    for entry in expired_entries:
+        entry.type = 'home'
+        if not entry.start_time:
+            try:
+                d_obj = datetime.strptime(entry.date, "%Y-%m-%d").date()
+                cal = get_year_calendar(d_obj.year, settings, custom_map)
+                target = cal.targets[cal.index(d_obj)]
+                if target > 0:
+                    entry.start_time = normalize_time_str(def_start)
+                    end_minutes = parse_time_minutes(entry.start_time) + gross_minutes_needed(round(target * 60))
+                    entry.end_time = f"{end_minutes // 60:02d}:{end_minutes % 60:02d}"
+            except Exception:
+                pass
+    mark_data_changed(min(e.date for e in expired_entries))
+    log_changes('work_entry', 'update', [(e.id, e.date) for e in expired_entries])
+    return len(expired_entries)
+
+def run_planned_conversion(today=None):
+    """
+    Einmal pro Tag: konvertiert nur den seit dem letzten Lauf abgelaufenen Bereich und schreibt den
+    Wasserstand ("konvertiert bis einschließlich") fort. Solange die Option aus ist, bleibt er stehen.
+    """
     try:
-        settings = db.session.query(Settings).first()
-        if not settings or not settings.auto_convert_planned: return
-
-        today_str = str(datetime.now().date())
-        expired_entries = WorkEntry.query.filter(WorkEntry.type == 'planned', WorkEntry.date < today_str).all()
-        if not expired_entries: return 
-
-        year = datetime.now().year
-        he_holidays = holidays.DE(subdiv='HE', years=year)
-        he_holidays[datetime(year, 12, 24).date()] = "Heiligabend"
-        he_holidays[datetime(year, 12, 31).date()] = "Silvester"
-        custom_map = {datetime.strptime(c.date, "%Y-%m-%d").date(): c for c in CustomHoliday.query.all()}
-        def_start = settings.default_start_time if settings.default_start_time else "08:00"
-
-        for entry in expired_entries:
-            entry.type = 'home'
-            if not entry.start_time:
-                try:
-                    d_obj = datetime.strptime(entry.date, "%Y-%m-%d").date()
-                    info = get_day_info(d_obj, settings, he_holidays, custom_map)
-                    target = info["target"]
-                    if target > 0:
-                        entry.start_time = normalize_time_str(def_start)
-                        gross_hours = calculate_gross_time_needed(target)
-                        sh, sm = map(int, entry.start_time.split(':'))
-                        start_minutes = sh * 60 + sm
-                        end_minutes = start_minutes + (gross_hours * 60)
-                        entry.end_time = f"{int(end_minutes // 60):02d}:{int(end_minutes % 60):02d}"
-                except Exception:
-                    pass
+        through = (today or datetime.now().date()) - timedelta(days=1)
+        watermark = get_app_state(PLANNED_WATERMARK_KEY)
+        if watermark and watermark >= str(through): return
+        if not get_config().settings.auto_convert_planned: return
+
+        from_date = date.fromisoformat(watermark) + timedelta(days=1) if watermark else None
+        converted = convert_expired_planned_days(from_date, through)
+        set_app_state(PLANNED_WATERMARK_KEY, str(through))
         db.session.commit()
+        if converted: app.logger.info(f"Auto-Convert: {converted} geplante Tage bis {through} umgewandelt")
     except Exception as e:
+        db.session.rollback()
         app.logger.error(f"Auto-Convert Fehler: {e}", exc_info=True)
 
+def convert_written_planned(dates):
+    """Nach einem Schreibvorgang: geplante Tage in der Vergangenheit sofort umwandeln (wie der Tageslauf)."""
+    # Altbestand mit unmöglichem Tag kann nicht konvertiert werden
+    days = [d for d in map(parse_date, dates) if d is not None]
+    if not days or min(days) >= datetime.now().date(): return
+    if convert_expired_planned_days(min(days), max(days)): db.session.commit()
+
+def start_planned_conversion_ticker(interval=PLANNED_TICK_INTERVAL):
+    """Hintergrund-Tick pro Prozess; nach Mitternacht greift der Wasserstand genau einmal."""
+    def loop():
+        while True:
+            time.sleep(interval)
+            with app.app_context(): run_planned_conversion()
+    threading.Thread(target=loop, name='planned-convert', daemon=True).start()
+
 
 # --- VALIDIERUNGS-HELPER ---
-def is_valid_date(date_str): return bool(re.match(r'^\d{4}-\d{2}-\d{2}$', str(date_str)))
+def parse_date(date_str):
+    """'YYYY-MM-DD' als Kalenderdatum; None bei falschem Format oder unmöglichem Tag (z.B. 2051-02-30)."""
+    if not re.match(r'^\d{4}-\d{2}-\d{2}$', str(date_str)): return None
+    try: return date.fromisoformat(date_str)
+    except ValueError: return None
+def is_valid_date(date_str): return parse_date(date_str) is not None
 def is_valid_time(time_str): return bool(re.match(r'^([01]\d|2[0-3]):([0-5]\d)$', str(time_str))) if time_str else True
 VALID_TYPES = ['home', 'office', 'dr', 'planned', 'sick', 'vacation', 'glz', '']
 
@@ -128,203 +261,531 @@ with app.app_context():
         db.session.add(Settings())
         db.session.commit()
     migrate_x_to_planned()
+    run_planned_conversion()
+    start_planned_conversion_ticker()
+    start_backup_scheduler(db_path, backup_dir, app.logger, BACKUP_CHECK_INTERVAL)
     app.logger.info("Anwendung erfolgreich gestartet.")
 
 
+# --- DATUMS-BEREICHE ---
+# Datumswerte liegen als ISO-Text (YYYY-MM-DD) vor und sortieren damit chronologisch. Bereiche immer halboffen
+# [start, ende) abfragen: das kann SQLite über den (date, type)-Index bedienen, ein LIKE über startswith nicht.
+def date_range(start, end_exclusive):
+    return and_(WorkEntry.date >= str(start), WorkEntry.date < str(end_exclusive))
+
+def days_range(first_day, last_day):
+    """Halboffener Bereich für zwei inklusive Tage (date-Objekte)."""
+    return date_range(first_day, last_day + timedelta(days=1))
+
+def month_range(year, month):
+    return date_range(date(year, month, 1), date(year + month // 12, month % 12 + 1, 1))
+
+def year_range(year):
+    return date_range(date(year, 1, 1), date(year + 1, 1, 1))
+
+
 # --- GLZ CARRYOVER LOGIK ---
+def mark_data_changed(from_date=None):
+    """
+    Verwirft alle GLZ-Checkpoints ab dem Monat des übergebenen Datums (None = alle) und erhöht die
+    Daten-Revision dieser und aller späteren Monate (Antwort-Cache/ETags).
+    Muss von jeder schreibenden Route vor dem Commit aufgerufen werden.
+    """
+    query = GlzCheckpoint.query
+    if from_date is not None:
+        query = query.filter(GlzCheckpoint.month >= str(from_date)[:7])
+    query.delete(synchronize_session=False)
+
+    from_month = str(from_date)[:7] if from_date is not None else ALL_MONTHS
+    next_seq = db.session.query(func.coalesce(func.max(DataRevision.seq), 0) + 1).scalar_subquery()
+    stmt = sqlite_insert(DataRevision).values(from_month=from_month, seq=next_seq)
+    db.session.execute(stmt.on_conflict_do_update(index_elements=['from_month'], set_={"seq": stmt.excluded.seq}))
+
+# --- ÄNDERUNGSPROTOKOLL (Delta-Sync) ---
+# Ältere Einträge werden abgeschnitten; Clients, die weiter zurückliegen, verwerfen ihren Cache (reset)
+CHANGE_LOG_RETENTION = int(os.environ.get('CHANGE_LOG_RETENTION', 20000))
+CHANGES_PAGE_SIZE = 1000
+
+def log_changes(table_name, op, rows):
+    """
+    Hängt geschriebene Zeilen [(row_id, date), ...] an das Änderungsprotokoll an.
+    Läuft in der Transaktion der schreibenden Route; SQLite serialisiert Schreiber -> seq folgt der Commit-Reihenfolge.
+    """
+    if not rows: return
+    db.session.execute(insert(ChangeLog), [{"table_name": table_name, "op": op, "row_id": row_id, "date": d} for row_id, d in rows])
+    max_seq = db.session.query(func.max(ChangeLog.seq)).scalar_subquery()
+    ChangeLog.query.filter(ChangeLog.seq <= max_seq - CHANGE_LOG_RETENTION).delete(synchronize_session=False)
+    if has_request_context():
+        # Schreiber sind serialisiert -> die Zeilen dieses Aufrufs haben lückenlose seqs bis zum Maximum
+        last = db.session.query(func.max(ChangeLog.seq)).scalar()
+        g.setdefault('uncommitted_change_seqs', []).append([last - len(rows) + 1, last])
+
+@event.listens_for(db.session, 'after_commit')
+def promote_change_seqs(session):
+    if has_request_context() and g.get('uncommitted_change_seqs'):
+        g.setdefault('change_seqs', []).extend(g.pop('uncommitted_change_seqs'))
+
+@event.listens_for(db.session, 'after_rollback')
+def drop_change_seqs(session):
+    # Verworfene seqs vergibt SQLite neu -> dürfen nicht als eigene gemeldet werden
+    if has_request_context(): g.pop('uncommitted_change_seqs', None)
+
+def written_change_seqs():
+    """
+    seq-Bereiche [erste, letzte], die dieser Request committet hat. Schreibende Routen geben sie als
+    change_seqs zurück, damit der Client die SSE-Events seiner eigenen Änderungen überspringt.
+    """
+    return g.get('change_seqs', [])
+
+def load_changes(since, limit=CHANGES_PAGE_SIZE):
+    """Protokollzeilen nach seq (aufsteigend, höchstens limit) und ob danach noch weitere folgen."""
+    rows = ChangeLog.query.filter(ChangeLog.seq > since).order_by(ChangeLog.seq).limit(limit + 1).all()
+    return rows[:limit], len(rows) > limit
+
+def changes_stale_from(rows):
+    """Frühester betroffener Monat; Änderungen ohne Datum (Settings) betreffen alle Monate."""
+    dates = [r.date for r in rows]
+    return None if not rows else ALL_MONTHS if None in dates else min(dates)[:7]
+
+def current_data_revision():
+    return db.session.query(func.coalesce(func.max(DataRevision.seq), 0)).scalar()
+
+def store_glz_checkpoints(checkpoints, seen_revision=None):
+    """
+    Schreibt berechnete Monatsend-Salden (Upsert). Fehler sind unkritisch, da nur Cache.
+    Mit seen_revision wird verworfen, falls seit der Berechnung geschrieben wurde (Salden wären veraltet).
+    """
+    if not checkpoints: return
+    try:
+        stmt = sqlite_insert(GlzCheckpoint).values([{"month": m, "balance": b} for m, b in checkpoints])
+        stmt = stmt.on_conflict_do_update(index_elements=['month'], set_={"balance": stmt.excluded.balance})
+        db.session.execute(stmt)
+        # Erst nach dem Upsert prüfen: die Transaktion hält jetzt die Schreibsperre, kein Schreiber kommt dazwischen
+        if seen_revision is not None and current_data_revision() != seen_revision:
+            db.session.rollback()
+            return
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        app.logger.warning(f"GLZ-Checkpoints konnten nicht gespeichert werden: {e}")
+
+def defer_glz_checkpoints(checkpoints, seen_revision):
+    """
+    Merkt Checkpoints aus einem Lesepfad vor und schreibt sie erst nach dem Ausliefern der Antwort
+    (GET-Routen committen dadurch nie). Außerhalb eines Requests (Hintergrund-Jobs) sofort.
+    """
+    if not checkpoints: return
+    if not has_request_context():
+        store_glz_checkpoints(checkpoints, seen_revision)
+        return
+    if 'glz_checkpoints' not in g:
+        # Die zuerst (= am frühesten) gelesene Revision gilt für alle Checkpoints dieses Requests
+        g.glz_checkpoints = pending = {}
+
+        @after_this_request
+        def store_after_response(response):
+            def store():
+                with app.app_context():
+                    store_glz_checkpoints(sorted(pending.items()), seen_revision)
+            response.call_on_close(store)
+            return response
+    g.glz_checkpoints.update(checkpoints)
+
+def load_day_totals(start_date, end_date):
+    """
+    Liefert je gebuchtem Tag (aufsteigend) die Buchungstypen, die Netto-Summe aus Zeiten
+    (home/office/dr) und die Anzahl geplanter Einträge. Summiert wird per GROUP BY in SQLite.
+    """
+    rows = db.session.query(
+        WorkEntry.date, WorkEntry.type, func.count(WorkEntry.id),
+        func.sum(func.round(WorkEntry.net_minutes / 60.0, 2))
+    ).filter(days_range(start_date, end_date)).group_by(WorkEntry.date, WorkEntry.type).order_by(WorkEntry.date).all()
+    
+    days = []
+    for d_str, e_type, count, net in rows:
+        # Altbestand vor der Kalenderprüfung kann unmögliche Tage enthalten -> überspringen
+        if parse_date(d_str) is None: continue
+        if not days or days[-1][0] != d_str: days.append([d_str, [], 0.0, 0])
+        day = days[-1]
+        day[1].append(e_type)
+        if e_type == 'planned': day[3] += count
+        elif e_type in ["home", "office", "dr"]: day[2] += net or 0.0
+    return days
+
 def get_glz_carryover(year, month, settings, custom_map):
     """
     Berechnet den exakten GLZ Saldo bis zum Tag vor dem angefragten Monat.
+    Nutzt den jüngsten gültigen Monatsend-Checkpoint und rechnet nur die Buchungstage danach nach;
+    neu berechnete Checkpoints werden erst nach der Antwort geschrieben (defer_glz_checkpoints).
     """
     target_date = date(year, month, 1) - timedelta(days=1)
+    target_month = target_date.strftime('%Y-%m')
+    # Vor den Daten lesen: ändert sich die Revision bis zum Speichern, werden die Checkpoints verworfen
+    seen_revision = current_data_revision()
     
     last_override = WorkEntry.query.filter(
-        WorkEntry.date <= str(target_date),
+        WorkEntry.date < str(date(year, month, 1)),
         WorkEntry.glz_override.isnot(None)
-    ).order_by(WorkEntry.date.desc()).first()
+    ).order_by(WorkEntry.date.desc(), WorkEntry.id.desc()).first()
     
     if last_override:
         running_glz = last_override.glz_override
         start_date = datetime.strptime(last_override.date, "%Y-%m-%d").date() + timedelta(days=1)
+        anchor_month = last_override.date[:7]
     else:
+        # Ohne PDF-Anker beginnt der Saldo jedes Jahr bei 0
+        if month == 1: return 0.0
         running_glz = 0.0
-        first_entry = WorkEntry.query.filter(
-            WorkEntry.date >= f"{year}-01-01",
-            WorkEntry.date <= str(target_date)
-        ).order_by(WorkEntry.date.asc()).first()
-        if not first_entry: return 0.0
-        start_date = datetime.strptime(first_entry.date, "%Y-%m-%d").date()
+        start_date = date(year, 1, 1)
+        anchor_month = f"{year}-01"
+
+    # Checkpoints sind nur gültig, wenn sie auf demselben Anker aufbauen
+    checkpoint = GlzCheckpoint.query.filter(
+        GlzCheckpoint.month >= anchor_month,
+        GlzCheckpoint.month <= target_month
+    ).order_by(GlzCheckpoint.month.desc()).first()
+
+    if checkpoint:
+        if checkpoint.month == target_month: return checkpoint.balance
+        running_glz = checkpoint.balance
+        cp_year, cp_month = map(int, checkpoint.month.split('-'))
+        start_date = date(cp_year, cp_month, calendar.monthrange(cp_year, cp_month)[1]) + timedelta(days=1)
         
     if start_date > target_date:
         return running_glz
 
-    entries_in_range = WorkEntry.query.filter(
-        WorkEntry.date >= str(start_date),
-        WorkEntry.date <= str(target_date)
-    ).all()
+    # Tage ohne Buchung verändern den Saldo nie -> nur gebuchte Tage (in SQL vorsummiert) nachrechnen
+    day_totals = iter(load_day_totals(start_date, target_date))
+    pending = next(day_totals, None)
     
-    entries_by_date = {}
-    for e in entries_in_range:
-        if e.date not in entries_by_date: entries_by_date[e.date] = []
-        entries_by_date[e.date].append(e)
+    new_checkpoints = []
+    month_start = start_date
+    while month_start <= target_date:
+        # GEFIXT: Jahre über den gesamten Zeitraum iterieren!
+        cal = get_year_calendar(month_start.year, settings, custom_map)
+        month_end = date(month_start.year, month_start.month, calendar.monthrange(month_start.year, month_start.month)[1])
+        month_end_str = str(month_end)
+        
+        while pending and pending[0] <= month_end_str:
+            d_str, day_types, time_net, planned_count = pending
+            i = cal.index(date.fromisoformat(d_str))
+            is_workday, target = cal.is_workday(i), cal.targets[i]
+            running_glz += calculate_glz_delta(is_workday, target, day_types, time_net + planned_count * target)
+            pending = next(day_totals, None)
         
-    # GEFIXT: Jahre über den gesamten Zeitraum iterieren!
-    years = list(range(start_date.year, target_date.year + 1))
-    he_hols = holidays.DE(subdiv='HE', years=years)
-    for y in years:
-        he_hols[date(y, 12, 24)] = "Heiligabend"
-        he_hols[date(y, 12, 31)] = "Silvester"
+        # Monatsende erreicht -> Saldo als Checkpoint materialisieren
+        new_checkpoints.append((month_end.strftime('%Y-%m'), running_glz))
+        month_start = month_end + timedelta(days=1)
         
-    curr = start_date
-    while curr <= target_date:
-        info = get_day_info(curr, settings, he_hols, custom_map)
-        day_entries = entries_by_date.get(str(curr), [])
+    defer_glz_checkpoints(new_checkpoints, seen_revision)
+    return running_glz
+
+
+# --- PDF IMPORT (DB-ABGLEICH) ---
+def merge_imported_entries(extracted_entries, overwrite):
+    """
+    Gleicht die aus einem PDF extrahierten Einträge mengenbasiert mit der Datenbank ab:
+    ein Prefetch des Zeitraums, Konfliktauflösung im Speicher, ein Bulk-Delete und ein Bulk-Insert.
+    Der Commit bleibt beim Aufrufer, damit mehrere Dokumente in einer Transaktion landen können.
+    """
+    config = get_config()
+    settings, custom_map = config.settings, config.custom_map
+
+    entries_by_date = {}
+    for e in extracted_entries:
+        d = e['date']
+        if d not in entries_by_date: entries_by_date[d] = []
+        entries_by_date[d].append(e)
+
+    first_date, last_date = min(entries_by_date), max(entries_by_date)
+    existing = db.session.query(WorkEntry.id, WorkEntry.date, WorkEntry.type).filter(days_range(first_date, last_date)).all()
+    existing_ids_by_date, existing_types = {}, set()
+    for entry_id, d_str, e_type in existing:
+        existing_ids_by_date.setdefault(d_str, []).append((entry_id, d_str))
+        existing_types.add((d_str, e_type))
+
+    delete_ids, new_rows = [], []
+    skipped = 0
+    for date_obj, entries in sorted(entries_by_date.items()):
+        date_iso = str(date_obj)
+        cal = get_year_calendar(date_obj.year, settings, custom_map)
+        is_free_day = not cal.is_workday(cal.index(date_obj))
         
-        day_net = 0.0
-        for e in day_entries:
-            if e.type == 'planned': day_net += info["target"]
-            elif e.type in ["home", "office", "dr"]: day_net += calculate_net_hours(e.start_time, e.end_time)
+        valid_entries = []
+        for e in entries:
+            has_times = bool(e['start'] and e['end'])
+            has_comment = bool(e['comment'])
+            
+            if has_times or not is_free_day or has_comment or e['glz_override'] is not None:
+                valid_entries.append(e)
         
-        is_paid_leave = any(e.type in ['sick', 'vacation'] for e in day_entries)
-        is_glz_day = any(e.type == 'glz' for e in day_entries)
+        if not valid_entries: continue
         
-        # Wenn der Tag "Leer" ist, belasten wir das GLZ nicht
-        is_empty = len(day_entries) == 0 or all(not e.type for e in day_entries)
+        if overwrite:
+            delete_ids.extend(existing_ids_by_date.get(date_iso, []))
+            existing_types = {key for key in existing_types if key[0] != date_iso}
         
-        day_delta = 0.0
-        if info["is_workday"]:
-            if is_paid_leave: day_delta = day_net
-            elif is_glz_day: day_delta = day_net - info["target"]
-            elif is_empty: day_delta = 0.0 
-            else: day_delta = day_net - info["target"]
-        else:
-            day_delta = day_net
+        for e in valid_entries:
+            if not overwrite and e['type'] and (date_iso, e['type']) in existing_types:
+                skipped += 1
+                continue
             
-        running_glz += day_delta
-        curr += timedelta(days=1)
-        
-    return running_glz
+            new_rows.append({
+                "date": date_iso, "type": e['type'], "start_time": e['start'], "end_time": e['end'],
+                "comment": e['comment'], "glz_override": e.get('glz_override')
+            })
+            existing_types.add((date_iso, e['type']))
 
+    if delete_ids:
+        WorkEntry.query.filter(WorkEntry.id.in_([i for i, _ in delete_ids])).delete(synchronize_session=False)
+        log_changes('work_entry', 'delete', delete_ids)
+    if new_rows:
+        # Bulk-Insert umgeht die Mapper-Events -> net_minutes hier selbst (in einem Rutsch) berechnen
+        net = net_minutes_batch([parse_time_minutes(r["start_time"]) for r in new_rows],
+                                [parse_time_minutes(r["end_time"]) for r in new_rows])
+        for row, minutes in zip(new_rows, net): row["net_minutes"] = minutes
+        inserted = db.session.execute(insert(WorkEntry).returning(WorkEntry.id, WorkEntry.date), new_rows).all()
+        log_changes('work_entry', 'insert', inserted)
+    mark_data_changed(first_date)
+    
+    return {"inserted": len(new_rows), "skipped": skipped, "replaced": len(delete_ids)}
 
-# --- PDF PARSER ---
-def parse_pdf_content(file_obj):
-    TYPE_MAP = {
-        "Mobil": "home", "Telearb": "home", "anwesend": "office", 
-        "Krank": "sick", "Urlaub": "vacation", "Erholungs": "vacation", "Zusatz": "vacation", "Sonder": "vacation",
-        "Gleitzeit": "glz", "GLZ": "glz",
-        "Dienstreise": "dr", "Fortbildung": "dr", "Reise": "dr",
-        "BUCHUNG FEHLT": "missing"
-    }
-    extracted_entries = []
+def format_import_message(counts):
+    msg = f"{counts['inserted']} Einträge importiert."
+    if counts['replaced']: msg += f" {counts['replaced']} ersetzt."
+    if counts['skipped']: msg += f" {counts['skipped']} übersprungen (bereits vorhanden)."
+    return msg
+
+
+# --- PDF BATCH-IMPORT ---
+PDF_PARSE_WORKERS = int(os.environ.get('PDF_PARSE_WORKERS', min(4, os.cpu_count() or 1)))
+_parse_pool = None
+
+# Wiederholte Uploads desselben PDFs überspringen das Parsing komplett
+pdf_cache = ParseCache(os.path.join(data_dir, 'pdf_cache'), int(os.environ.get('PDF_CACHE_MAX_MB', 50)) * 1024 * 1024)
+
+def get_parse_pool():
+    """
+    Prozess-Pool für das PDF-Parsing (wird erst bei Bedarf im jeweiligen Worker gestartet).
+    forkserver statt fork: der Worker hat laufende Threads (Import-Job, Ticker, Backup, SSE) -> ein fork
+    könnte gehaltene Locks (Logging, Connection-Pool) in die Kinder kopieren und dort hängen bleiben.
+    """
+    global _parse_pool
+    if _parse_pool is None:
+        method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+        _parse_pool = ProcessPoolExecutor(max_workers=PDF_PARSE_WORKERS, mp_context=multiprocessing.get_context(method))
+    return _parse_pool
+
+# Obergrenzen für entpackte Uploads (Schutz vor ZIP-Bomben)
+UPLOAD_MAX_FILE_BYTES = int(os.environ.get('UPLOAD_MAX_FILE_MB', 20)) * 1024 * 1024
+UPLOAD_MAX_TOTAL_BYTES = int(os.environ.get('UPLOAD_MAX_TOTAL_MB', 200)) * 1024 * 1024
+
+def collect_pdf_uploads(files):
+    """
+    Sammelt (Dateiname, Bytes) aus hochgeladenen PDFs und ZIP-Archiven.
+    ValueError, wenn eine Datei oder die Summe die Obergrenzen überschreitet.
+    """
+    docs, total = [], 0
+    def add(name, data):
+        nonlocal total
+        total += len(data)
+        if len(data) > UPLOAD_MAX_FILE_BYTES: raise ValueError(f"{name} ist zu groß")
+        if total > UPLOAD_MAX_TOTAL_BYTES: raise ValueError("Upload ist insgesamt zu groß")
+        docs.append((name, data))
+
+    for f in files:
+        name = f.filename or 'upload.pdf'
+        data = f.read()
+        if name.lower().endswith('.zip') or zipfile.is_zipfile(io.BytesIO(data)):
+            with zipfile.ZipFile(io.BytesIO(data)) as zf:
+                for info in zf.infolist():
+                    if info.is_dir() or info.filename.startswith('__MACOSX/'): continue
+                    if not info.filename.lower().endswith('.pdf'): continue
+                    # Nicht der Größenangabe im Archiv vertrauen: höchstens ein Byte über dem Limit entpacken
+                    with zf.open(info) as member:
+                        add(info.filename, member.read(UPLOAD_MAX_FILE_BYTES + 1))
+        else:
+            add(name, data)
+    return docs
+
+def import_pdf_documents(docs, overwrite, on_page=None, on_parsed=None):
+    """
+    Parst mehrere PDFs parallel im Prozess-Pool und übernimmt sie anschließend chronologisch,
+    damit spätere PDF-Saldo-Anker die früheren Monate korrekt fortschreiben. Bereits bekannte PDFs
+    kommen direkt aus dem Parse-Cache.
+    on_page wird pro gelesener Seite (Einzeldokument), on_parsed pro fertigem Dokument (Pool/Cache) gerufen.
+    """
+    cached = [pdf_cache.get(data) for _, data in docs]
+    to_parse = [i for i, entries in enumerate(cached) if entries is None]
     
-    with pdfplumber.open(file_obj) as pdf:
-        first_page_text = pdf.pages[0].extract_text()
-        match_my = re.search(r'Monat:?\s*([a-zA-ZäöüÄÖÜ]+)\s*[-_]?\s*(\d{4})', first_page_text)
-        if not match_my: raise ValueError("Monat/Jahr im PDF nicht erkannt")
-            
-        m_dict = {'Januar':1,'Februar':2,'März':3,'April':4,'Mai':5,'Juni':6,'Juli':7,'August':8,'September':9,'Oktober':10,'November':11,'Dezember':12}
-        month = m_dict.get(match_my.group(1))
-        year = int(match_my.group(2))
-        
-        daily_data = {}
-        curr_day = None
-
-        for page in pdf.pages:
-            tables = page.extract_tables()
-            for table in tables:
-                for row in table:
-                    if not row or len(row) < 2: continue
-                    col0 = str(row[0] or "").strip()
-                    
-                    if col0.startswith("Wochensumme") or col0.startswith("Tag") or col0.startswith("Zeitkonto") or col0.startswith("Kontingent"):
-                        curr_day = None
-                        continue
-                    
-                    dm = re.search(r'^(\d{2})\s+(MO|DI|MI|DO|FR|SA|SO)', col0)
-                    if dm: 
-                        curr_day = int(dm.group(1))
-                    elif curr_day is None: 
-                        continue
-
-                    if curr_day not in daily_data: daily_data[curr_day] = []
-                    
-                    full_row_text = " ".join([str(c) for c in row if c])
-                    found_type = None
-                    for k, v in TYPE_MAP.items():
-                        if k in full_row_text: found_type = v
-                    
-                    times = re.findall(r'(\d{2}:\d{2})', full_row_text)
-                    if times and all(t == "00:00" for t in times): times = []
-
-                    glz_saldo_val = None
-                    if dm:
-                        for c in reversed(row):
-                            c_str = str(c or "").strip()
-                            if re.match(r'^-?\d{1,3}[.,]\d{2}$', c_str):
-                                try:
-                                    glz_saldo_val = float(c_str.replace(',', '.'))
-                                    break 
-                                except ValueError: pass
-
-                    entry = {'type': None, 'times': [], 'glz_override': glz_saldo_val}
-                    is_valid = False
-                    
-                    if found_type == "missing":
-                        entry['type'] = ''
-                        entry['comment'] = "Buchung fehlt (PDF)"
-                        is_valid = True
-                    elif times and len(times) >= 2:
-                        entry['type'] = found_type if found_type else "office"
-                        entry['times'] = times
-                        is_valid = True
-                    elif found_type in ["vacation", "sick", "glz"]:
-                        entry['type'] = found_type
-                        is_valid = True
-                    
-                    if glz_saldo_val is not None:
-                        is_valid = True
-                    
-                    if is_valid:
-                        if not entry['times']:
-                            already_exists = False
-                            for existing in daily_data[curr_day]:
-                                if existing['type'] == entry['type'] and not existing['times']:
-                                    already_exists = True
-                                    if entry['glz_override'] is not None:
-                                        existing['glz_override'] = entry['glz_override']
-                                    break
-                            if already_exists:
-                                continue
-                        
-                        daily_data[curr_day].append(entry)
-
-        for d, blocks in daily_data.items():
-            try:
-                date_obj = date(year, month, d)
-                for b in blocks:
-                    extracted_entries.append({
-                        'date': date_obj,
-                        'type': b['type'] or '',
-                        'start': b['times'][0] if b['times'] else '',
-                        'end': b['times'][1] if b['times'] and len(b['times']) > 1 else '',
-                        'comment': b.get('comment', ''),
-                        'glz_override': b.get('glz_override')
-                    })
-            except ValueError: continue
-                
-    return extracted_entries
+    # Ein einzelnes Dokument lohnt den Pool-Overhead nicht
+    futures = {}
+    if len(to_parse) > 1:
+        pool = get_parse_pool()
+        futures = {i: pool.submit(parse_pdf_bytes, docs[i][1]) for i in to_parse}
+
+    results, parsed = [], []
+    for i, (name, data) in enumerate(docs):
+        try:
+            if cached[i] is not None:
+                entries = cached[i]
+            elif i in futures:
+                entries = futures[i].result()
+            else:
+                entries = parse_pdf_bytes(data, on_page)
+            if cached[i] is None: pdf_cache.put(data, entries)
+            # Im Thread geparste Dokumente melden ihren Fortschritt bereits seitenweise
+            if (cached[i] is not None or i in futures) and on_parsed: on_parsed(i)
+        except Exception as e:
+            app.logger.error(f"IMPORT ERROR ({name}): {e}", exc_info=True)
+            results.append({"file": name, "success": False, "message": "PDF konnte nicht gelesen werden."})
+            continue
+        if not entries:
+            results.append({"file": name, "success": True, "month": None, "message": "Keine Einträge gefunden."})
+            continue
+        parsed.append((min(e['date'] for e in entries), name, entries))
+
+    for first_date, name, entries in sorted(parsed, key=lambda p: p[0]):
+        try:
+            counts = merge_imported_entries(entries, overwrite)
+            db.session.commit()
+            results.append({"file": name, "success": True, "month": first_date.strftime('%Y-%m'),
+                            "message": format_import_message(counts), **counts})
+        except Exception as e:
+            db.session.rollback()
+            app.logger.error(f"IMPORT ERROR ({name}): {e}", exc_info=True)
+            results.append({"file": name, "success": False, "month": first_date.strftime('%Y-%m'),
+                            "message": "Fehler beim Import."})
+    return results
+
+def summarize_import(results):
+    ok_count = sum(1 for r in results if r['success'])
+    inserted = sum(r.get('inserted', 0) for r in results)
+    if len(results) == 1: message = results[0]['message']
+    else: message = f"{ok_count} von {len(results)} Dateien importiert ({inserted} Einträge)."
+    return {"success": ok_count > 0, "message": message, "files": results}
+
+
+# --- IMPORT-JOBS (HINTERGRUND) ---
+JOB_STALE_AFTER = timedelta(minutes=30)
+JOB_RETENTION = timedelta(days=7)
+_job_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='import-worker')
+
+STALE_JOB_RESULT = {"success": False, "message": "Import abgebrochen."}
+
+def is_stale_job(job):
+    """Job ohne Fortschritt seit JOB_STALE_AFTER: der Worker-Prozess wurde beendet (z.B. Neustart)."""
+    return job.status in ('queued', 'running') and job.updated_at < datetime.now() - JOB_STALE_AFTER
+
+def fail_stale_import_jobs():
+    """Schreibt abgebrochene Jobs als 'failed' fest (beim Start und beim Anlegen neuer Jobs, nie im GET)."""
+    ImportJob.query.filter(
+        ImportJob.status.in_(('queued', 'running')), ImportJob.updated_at < datetime.now() - JOB_STALE_AFTER
+    ).update({"status": "failed", "result": json.dumps(STALE_JOB_RESULT)}, synchronize_session=False)
+
+# Jobs, die ein beendeter Prozess hinterlassen hat, beim Start festschreiben
+with app.app_context():
+    fail_stale_import_jobs()
+    db.session.commit()
+
+def enqueue_import_job(docs, overwrite):
+    """Legt einen Import-Job an und übergibt ihn dem Hintergrund-Thread. Liefert die Job-ID."""
+    ImportJob.query.filter(ImportJob.created_at < datetime.now() - JOB_RETENTION).delete(synchronize_session=False)
+    fail_stale_import_jobs()
+    job = ImportJob(id=uuid.uuid4().hex)
+    db.session.add(job)
+    db.session.commit()
+    _job_executor.submit(run_import_job, job.id, docs, overwrite)
+    return job.id
+
+def run_import_job(job_id, docs, overwrite):
+    with app.app_context():
+        job = db.session.get(ImportJob, job_id)
+        try:
+            page_counts = []
+            for _, data in docs:
+                try: page_counts.append(count_pdf_pages(data))
+                except Exception: page_counts.append(0)
+            job.status = 'running'
+            job.pages_total = sum(page_counts)
+            db.session.commit()
+
+            def on_page():
+                job.pages_done += 1
+                db.session.commit()
+
+            def on_parsed(i):
+                job.pages_done += page_counts[i]
+                db.session.commit()
+
+            results = import_pdf_documents(docs, overwrite, on_page, on_parsed)
+            job.status = 'done'
+            job.pages_done = job.pages_total
+            job.result = json.dumps(summarize_import(results))
+        except Exception as e:
+            db.session.rollback()
+            app.logger.error(f"IMPORT-JOB {job_id} fehlgeschlagen: {e}", exc_info=True)
+            job = db.session.get(ImportJob, job_id)
+            job.status = 'failed'
+            job.result = json.dumps({"success": False, "message": "Fehler beim Import."})
+        db.session.commit()
 
 
 # --- API ROUTEN ---
 
+# --- FRONTEND ---
+# Gehashte Vendor-Dateien ändern nie ihren Inhalt -> ein Jahr cachen, ohne Revalidierung
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+_index_cache = {}
+
+def vendor_dir():
+    return app.config.get('VENDOR_DIR', assets.VENDOR_DIR)
+
+def load_index_page():
+    """
+    index.html mit lokalen Vendor-Pfaden (falls gebaut), gzip-Variante und ETag.
+    Pro Prozess gecacht, bis sich index.html oder das Manifest ändern.
+    """
+    index_path = os.path.join(app.static_folder, 'index.html')
+    manifest_path = os.path.join(vendor_dir(), assets.MANIFEST_FILE)
+    key = (index_path, os.path.getmtime(index_path), manifest_path,
+           os.path.getmtime(manifest_path) if os.path.exists(manifest_path) else None)
+    page = _index_cache.get('page')
+    if page is None or page[0] != key:
+        with open(index_path, encoding='utf-8') as f:
+            body = assets.localize_html(f.read(), assets.load_manifest(vendor_dir())).encode('utf-8')
+        page = (key, body, gzip.compress(body, 6, mtime=0), hashlib.sha256(body).hexdigest()[:16])
+        _index_cache['page'] = page
+    return page[1:]
+
 @app.route('/')
 def index():
-    return app.send_static_file('index.html')
+    body, body_gz, etag = load_index_page()
+    if etag in request.if_none_match:
+        resp = app.response_class(status=304)
+    elif 'gzip' in request.headers.get('Accept-Encoding', ''):
+        resp = app.response_class(body_gz, mimetype='text/html')
+        resp.headers['Content-Encoding'] = 'gzip'
+    else:
+        resp = app.response_class(body, mimetype='text/html')
+    resp.set_etag(etag)
+    resp.headers['Cache-Control'] = 'no-cache'
+    resp.headers['Vary'] = 'Accept-Encoding'
+    return resp
+
+@app.route('/assets/<path:filename>')
+def vendor_asset(filename):
+    path, encoding = assets.select_variant(vendor_dir(), filename, request.headers.get('Accept-Encoding'))
+    resp = send_from_directory(vendor_dir(), path, mimetype=assets.guess_mimetype(filename))
+    if encoding: resp.headers['Content-Encoding'] = encoding
+    resp.headers['Vary'] = 'Accept-Encoding'
+    resp.headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+    return resp
 
 @app.route('/api/settings', methods=['GET', 'POST'])
 def handle_settings():
-    settings = db.session.query(Settings).first()
     if request.method == 'POST':
+        settings = db.session.query(Settings).first()
         data = request.json
         if not data: return jsonify({"success": False, "message": "Keine Daten"}), 400
         
@@ -338,35 +799,107 @@ def handle_settings():
             
             def_start = data.get('default_start_time', '08:00')
             settings.default_start_time = normalize_time_str(def_start) if def_start else '08:00'
+            was_auto_convert = settings.auto_convert_planned
             settings.auto_convert_planned = bool(data.get('auto_convert_planned', True))
+            # Beim Wiedereinschalten alle inzwischen abgelaufenen Tage nachholen
+            if settings.auto_convert_planned and not was_auto_convert: set_app_state(PLANNED_WATERMARK_KEY, None)
             
+            mark_data_changed()
+            log_changes('settings', 'update', [(settings.id, None)])
+            bump_config_version()
             db.session.commit()
-            return jsonify({"success": True})
+            run_planned_conversion()
+            return jsonify({"success": True, "change_seqs": written_change_seqs()})
         except ValueError:
             return jsonify({"success": False, "message": "Ungültiges Datenformat"}), 400
     
-    active_list = [int(x) for x in settings.active_weekdays.split(',')] if settings.active_weekdays else [0,1,2,3,4]
-    return jsonify({ 
+    return jsonify(settings_payload(get_config().settings))
+
+def settings_payload(settings):
+    return { 
         "weekly_hours": settings.weekly_hours, 
-        "active_weekdays": active_list, 
+        "active_weekdays": list(settings.active_days), 
         "ho_quota_percent": settings.ho_quota_percent,
         "hide_weekends": settings.hide_weekends,
         "default_start_time": settings.default_start_time,
         "auto_convert_planned": settings.auto_convert_planned
-    })
+    }
 
-@app.route('/api/month/<int:year>/<int:month>', methods=['GET'])
-def get_month_data(year, month):
-    auto_convert_expired_planned_days()
-    settings = db.session.query(Settings).first()
+# --- MONATSANSICHT ---
+def build_day_row(date_obj, cal, day_entries, running_glz):
+    """
+    Baut die Tageszeile aus den Einträgen eines Tages (in Erfassungsreihenfolge).
+    Gibt (Zeile, HO-Stunden, Büro-Stunden, GLZ-Saldo nach dem Tag) zurück.
+    """
+    i = cal.index(date_obj)
+    is_workday, target = cal.is_workday(i), cal.targets[i]
+    holiday_name = cal.holiday_names[i]
+
+    day_net = 0.0
+    day_ho_sum = 0.0
+    day_office_sum = 0.0
+    day_override = None
     
-    he_holidays = holidays.DE(subdiv='HE', years=year)
-    he_holidays[datetime(year, 12, 24).date()] = "Heiligabend"
-    he_holidays[datetime(year, 12, 31).date()] = "Silvester"
-    custom_map = {datetime.strptime(c.date, "%Y-%m-%d").date(): c for c in CustomHoliday.query.all()}
+    frontend_entries = []
+    for e in day_entries:
+        hours = 0.0
+        if e.type == 'planned': hours = target
+        elif e.type in ["home", "office", "dr"]: hours = entry_net_hours(e)
+        
+        glz_over = getattr(e, 'glz_override', None)
+        if glz_over is not None: day_override = glz_over
+
+        frontend_entries.append({
+            "id": e.id, "type": e.type, "start": e.start_time or "", "end": e.end_time or "",
+            "net": round(hours, 2), "comment": e.comment or "", "glz_override": glz_over
+        })
+        
+        day_net += hours
+        if e.type in ["home", "planned"]: day_ho_sum += hours
+        elif e.type in ["office", "dr"]: day_office_sum += hours
+
+    main_type = ""
+    if day_entries:
+        if day_office_sum > day_ho_sum: main_type = "office"
+        elif day_ho_sum > 0: main_type = "home"
+        elif any(e.type == 'planned' for e in day_entries): main_type = "planned"
+        elif any(e.type == 'sick' for e in day_entries): main_type = "sick"
+        elif any(e.type == 'vacation' for e in day_entries): main_type = "vacation"
+        else: main_type = day_entries[0].type
+        
+    running_glz += calculate_glz_delta(is_workday, target, [e.type for e in day_entries], day_net)
+    if day_override is not None: running_glz = day_override
     
-    month_str = f"{year}-{month:02d}"
-    all_entries = WorkEntry.query.filter(WorkEntry.date.startswith(month_str)).all()
+    row = {
+        "row_type": "day", "date": str(date_obj), "day_num": date_obj.day, "weekday_index": date_obj.weekday(),
+        "iso_week": date_obj.isocalendar()[1], "is_holiday": (holiday_name != "" and not is_workday),
+        "holiday_name": holiday_name, "is_short_day": bool(cal.flags[i] & FLAG_SHORT_DAY), 
+        "is_off_day": bool(cal.flags[i] & FLAG_OFF_DAY), "daily_target": target,
+        "entries": frontend_entries, "total_net": round(day_net, 2), "main_type": main_type,
+        "glz_saldo": round(running_glz, 2), "glz_override": day_override
+    }
+    return row, day_ho_sum, day_office_sum, running_glz
+
+def week_summary(iso_week, week_sum, settings):
+    return {"row_type": "summary", "iso_week": iso_week, "sum": round(week_sum, 2), "target": settings.weekly_hours}
+
+def month_stats(total_ho, total_office, total_target_month, workdays, weeks_count, running_glz, settings):
+    max_ho = total_target_month * (settings.ho_quota_percent / 100)
+    avg_per_week = round((total_ho + total_office) / weeks_count, 2) if weeks_count else 0
+    return {
+        "total_ho_made": round(total_ho, 2), "total_office_made": round(total_office, 2),
+        "total_work_made": round(total_ho + total_office, 2), "total_ho_allowed": round(max_ho, 2),
+        "avg_per_week": avg_per_week, "workdays_month": workdays, "current_glz": round(running_glz, 2)
+    }
+
+def build_month_view(year, month, config=None):
+    """Baut Tageszeilen, Wochensummen und Statistik eines Monats (ohne Auto-Konvertierung)."""
+    config = config or get_config()
+    settings, custom_map = config.settings, config.custom_map
+    cal = get_year_calendar(year, settings, custom_map)
+    
+    # Innerhalb eines Tages in Erfassungsreihenfolge (der (date, type)-Index würde sonst nach Typ sortieren)
+    all_entries = WorkEntry.query.filter(month_range(year, month)).order_by(WorkEntry.date, WorkEntry.id).all()
     entries_by_date = {}
     for e in all_entries:
         if e.date not in entries_by_date: entries_by_date[e.date] = []
@@ -375,154 +908,318 @@ def get_month_data(year, month):
     total_ho, total_office, workdays, current_week_sum = 0.0, 0.0, 0, 0.0
     total_target_month = 0.0
     response_items = []
+    weeks_count = 0
     
     running_glz = get_glz_carryover(year, month, settings, custom_map)
     num_days = calendar.monthrange(year, month)[1]
     
     for day in range(1, num_days + 1):
-        date_obj = datetime(year, month, day).date()
-        date_str = str(date_obj)
-        iso_week = date_obj.isocalendar()[1]
-        info = get_day_info(date_obj, settings, he_holidays, custom_map)
-        
-        if info["is_workday"]: 
+        date_obj = date(year, month, day)
+        i = cal.index(date_obj)
+        if cal.is_workday(i): 
             workdays += 1
-            total_target_month += info["target"]
-
-        day_entries = entries_by_date.get(date_str, [])
-        day_net = 0.0
-        day_ho_sum = 0.0
-        day_office_sum = 0.0
-        day_override = None
-        
-        frontend_entries = []
-        for e in day_entries:
-            hours = 0.0
-            if e.type == 'planned': hours = info["target"]
-            elif e.type in ["home", "office", "dr"]: hours = calculate_net_hours(e.start_time, e.end_time)
-            
-            glz_over = getattr(e, 'glz_override', None)
-            if glz_over is not None: day_override = glz_over
-
-            frontend_entries.append({
-                "id": e.id, "type": e.type, "start": e.start_time or "", "end": e.end_time or "",
-                "net": round(hours, 2), "comment": e.comment or "", "glz_override": glz_over
-            })
-            
-            day_net += hours
-            if e.type in ["home", "planned"]: day_ho_sum += hours
-            elif e.type in ["office", "dr"]: day_office_sum += hours
+            total_target_month += cal.targets[i]
 
+        row, day_ho_sum, day_office_sum, running_glz = build_day_row(
+            date_obj, cal, entries_by_date.get(str(date_obj), []), running_glz)
         total_ho += day_ho_sum
         total_office += day_office_sum
-        current_week_sum += day_net
-        
-        main_type = ""
-        if day_entries:
-            if day_office_sum > day_ho_sum: main_type = "office"
-            elif day_ho_sum > 0: main_type = "home"
-            elif any(e.type == 'planned' for e in day_entries): main_type = "planned"
-            elif any(e.type == 'sick' for e in day_entries): main_type = "sick"
-            elif any(e.type == 'vacation' for e in day_entries): main_type = "vacation"
-            else: main_type = day_entries[0].type
-            
-        day_delta = 0.0
-        is_paid_leave = any(e.type in ['sick', 'vacation'] for e in day_entries)
-        is_glz_day = any(e.type == 'glz' for e in day_entries)
-        
-        is_empty = len(day_entries) == 0 or all(not e.type for e in day_entries)
-        
-        if info["is_workday"]:
-            if is_paid_leave: day_delta = day_net
-            elif is_glz_day: day_delta = day_net - info["target"]
-            elif is_empty: day_delta = 0.0
-            else: day_delta = day_net - info["target"]
-        else:
-            day_delta = day_net
-
-        running_glz += day_delta
-        if day_override is not None: running_glz = day_override
-        
-        response_items.append({
-            "row_type": "day", "date": date_str, "day_num": day, "weekday_index": date_obj.weekday(),
-            "iso_week": iso_week, "is_holiday": (info["holiday_name"] != "" and not info["is_workday"]),
-            "holiday_name": info["holiday_name"], "is_short_day": info["is_short_day"], 
-            "is_off_day": info["is_off_day"], "daily_target": info["target"],
-            "entries": frontend_entries, "total_net": round(day_net, 2), "main_type": main_type,
-            "glz_saldo": round(running_glz, 2), "glz_override": day_override
-        })
+        current_week_sum += day_ho_sum + day_office_sum
+        response_items.append(row)
         
         if date_obj.weekday() == 6 or day == num_days:
-            response_items.append({
-                "row_type": "summary", "iso_week": iso_week, 
-                "sum": round(current_week_sum, 2), "target": settings.weekly_hours
-            })
+            response_items.append(week_summary(row["iso_week"], current_week_sum, settings))
+            weeks_count += 1
             current_week_sum = 0.0
 
-    max_ho = total_target_month * (settings.ho_quota_percent / 100)
-    weeks_count = len([x for x in response_items if x['row_type'] == 'summary'])
-    avg_per_week = round((total_ho + total_office) / weeks_count, 2) if weeks_count else 0
-    
-    return jsonify({
+    return {
         "items": response_items,
-        "stats": {
-            "total_ho_made": round(total_ho, 2), "total_office_made": round(total_office, 2),
-            "total_work_made": round(total_ho + total_office, 2), "total_ho_allowed": round(max_ho, 2),
-            "avg_per_week": avg_per_week, "workdays_month": workdays, "current_glz": round(running_glz, 2)
-        }
-    })
+        "stats": month_stats(total_ho, total_office, total_target_month, workdays, weeks_count, running_glz, settings)
+    }
 
-@app.route('/api/year/<int:year>', methods=['GET'])
-def get_year_data(year):
-    settings = db.session.query(Settings).first()
-    he_holidays = holidays.DE(state='HE', years=year)
-    custom_map = {datetime.strptime(c.date, "%Y-%m-%d").date(): c for c in CustomHoliday.query.all()}
+def build_day_delta(date_str):
+    """
+    Teil-Antwort nach dem Speichern/Löschen eines Tages: neue Tageszeile, Summe der betroffenen Woche,
+    Monatsstatistik und die GLZ-Salden ab diesem Tag bis Monatsende (nur diese ändern sich).
+    Ohne Neuaufbau des Monats: Einträge werden nur für den Tag selbst geladen; Woche, Statistik und
+    GLZ-Verlauf laufen über die per GROUP BY vorsummierten Tageswerte ab dem Monatsanfangs-Checkpoint.
+    """
+    d = date.fromisoformat(date_str)
+    config = get_config()
+    settings, custom_map = config.settings, config.custom_map
+    cal = get_year_calendar(d.year, settings, custom_map)
+    num_days = calendar.monthrange(d.year, d.month)[1]
     
-    all_entries = WorkEntry.query.filter(WorkEntry.date.startswith(f"{year}-")).all()
+    # Je Tag: (Typen, HO-Stunden ohne Planung, Büro-Stunden, Anzahl geplant)
+    totals = {}
+    rows = db.session.query(
+        WorkEntry.date, WorkEntry.type, func.count(WorkEntry.id),
+        func.sum(func.round(WorkEntry.net_minutes / 60.0, 2))
+    ).filter(month_range(d.year, d.month)).group_by(WorkEntry.date, WorkEntry.type).all()
+    for d_str, e_type, count, net in rows:
+        day = totals.setdefault(d_str, [[], 0.0, 0.0, 0])
+        day[0].append(e_type)
+        if e_type == 'home': day[1] += net or 0.0
+        elif e_type in ["office", "dr"]: day[2] += net or 0.0
+        elif e_type == 'planned': day[3] += count
+    # Letzter Override je Tag (in Erfassungsreihenfolge) gewinnt, wie in der Tageszeile
+    overrides = dict(db.session.query(WorkEntry.date, WorkEntry.glz_override).filter(
+        month_range(d.year, d.month), WorkEntry.glz_override.isnot(None)
+    ).order_by(WorkEntry.date, WorkEntry.id).all())
+
+    total_ho, total_office, workdays, total_target_month = 0.0, 0.0, 0, 0.0
+    week_sums, weeks_count = {}, 0
+    day_row, glz_tail = None, []
+    running_glz = get_glz_carryover(d.year, d.month, settings, custom_map)
     
-    data = []
-    for m in range(1, 13):
-        m_str = f"{year}-{m:02d}"
-        m_entries = [e for e in all_entries if e.date.startswith(m_str)]
-        
-        ho_h, off_h, wd_count, target_month = 0.0, 0.0, 0, 0.0
-        d_ho, d_off, d_vac = set(), set(), set()
-        
-        num_days = calendar.monthrange(year, m)[1]
-        for day in range(1, num_days+1):
-            dt = datetime(year, m, day).date()
-            inf = get_day_info(dt, settings, he_holidays, custom_map)
-            if inf["is_workday"]: 
-                wd_count += 1
-                target_month += inf["target"]
-        
-        for e in m_entries:
-            h = 0.0
-            if e.type == 'planned':
-                d_obj = datetime.strptime(e.date, "%Y-%m-%d").date()
-                inf = get_day_info(d_obj, settings, he_holidays, custom_map)
-                h = inf["target"]
-            elif e.type in ['home', 'office', 'dr']:
-                h = calculate_net_hours(e.start_time, e.end_time)
-            
-            if e.type in ['home', 'planned']: 
-                ho_h += h
-                d_ho.add(e.date)
-            elif e.type in ['office', 'dr']: 
-                off_h += h
-                d_off.add(e.date)
-            elif e.type == 'vacation':
-                d_obj = datetime.strptime(e.date, "%Y-%m-%d").date()
-                if get_day_info(d_obj, settings, he_holidays, custom_map)["is_workday"]:
-                    d_vac.add(e.date)
+    for day in range(1, num_days + 1):
+        date_obj = date(d.year, d.month, day)
+        d_str = str(date_obj)
+        i = cal.index(date_obj)
+        is_workday, target = cal.is_workday(i), cal.targets[i]
+        if is_workday:
+            workdays += 1
+            total_target_month += target
+
+        if date_obj == d:
+            day_entries = WorkEntry.query.filter_by(date=date_str).order_by(WorkEntry.id).all()
+            day_row, day_ho_sum, day_office_sum, running_glz = build_day_row(date_obj, cal, day_entries, running_glz)
+        else:
+            day_types, day_ho_sum, day_office_sum, planned_count = totals.get(d_str, ((), 0.0, 0.0, 0))
+            day_ho_sum += planned_count * target
+            running_glz += calculate_glz_delta(is_workday, target, day_types, day_ho_sum + day_office_sum)
+            if d_str in overrides: running_glz = overrides[d_str]
         
-        data.append({ 
-            "month": m, "workdays": wd_count, "days_ho": len(d_ho), "days_office": len(d_off), 
-            "days_vacation": len(d_vac), "ho_hours_made": round(ho_h, 2), 
-            "ho_hours_allowed": round(target_month * (settings.ho_quota_percent/100), 2), 
-            "office_hours_made": round(off_h, 2) 
+        total_ho += day_ho_sum
+        total_office += day_office_sum
+        iso_week = date_obj.isocalendar()[1]
+        week_sums[iso_week] = week_sums.get(iso_week, 0.0) + day_ho_sum + day_office_sum
+        if date_obj.weekday() == 6 or day == num_days: weeks_count += 1
+        if date_obj >= d: glz_tail.append({"date": d_str, "glz_saldo": round(running_glz, 2)})
+
+    return {
+        "day": day_row, "week": week_summary(day_row["iso_week"], week_sums[day_row["iso_week"]], settings),
+        "stats": month_stats(total_ho, total_office, total_target_month, workdays, weeks_count, running_glz, settings),
+        "glz_tail": glz_tail
+    }
+
+@app.route('/api/month/<int:year>/<int:month>', methods=['GET'])
+def get_month_data(year, month):
+    return cached_json_response(('month', year, month), f"{year}-{month:02d}", lambda: build_month_view(year, month))
+
+def build_year_view(year, config=None):
+    """Monatsweise HO-/Büro-Statistik eines Jahres."""
+    config = config or get_config()
+    settings, custom_map = config.settings, config.custom_map
+    cal = get_year_calendar(year, settings, custom_map)
+    
+    rows = db.session.query(
+        WorkEntry.date, WorkEntry.type, func.count(WorkEntry.id),
+        func.sum(func.round(WorkEntry.net_minutes / 60.0, 2))
+    ).filter(
+        year_range(year),
+        WorkEntry.type.in_(list(TYPE_CODES))
+    ).group_by(WorkEntry.date, WorkEntry.type).all()
+    
+    # Spaltenweise laden: Tag im Jahr, Typ-Code, Netto-Stunden (in SQL je Tag und Typ vorsummiert)
+    day_idx, type_codes, net_hours = array('H'), array('b'), array('d')
+    for d_str, e_type, count, net in rows:
+        d_obj = parse_date(d_str)
+        if d_obj is None: continue # Altbestand mit unmöglichem Tag
+        i = d_obj.toordinal() - cal.first_ordinal
+        day_idx.append(i)
+        type_codes.append(TYPE_CODES[e_type])
+        if e_type == 'planned': net_hours.append(count * cal.targets[i])
+        elif e_type == 'vacation': net_hours.append(0.0)
+        else: net_hours.append(net or 0.0)
+    
+    return aggregate_year(cal, day_idx, type_codes, net_hours, settings.ho_quota_percent)
+
+@app.route('/api/year/<int:year>', methods=['GET'])
+def get_year_data(year):
+    return cached_json_response(('year', year), f"{year}-12", lambda: build_year_view(year))
+
+# --- START-DATEN ---
+def build_bootstrap(year, month, with_year):
+    """Alles für den ersten Seitenaufbau aus einem Konfigurations-Snapshot (gleicher Kalender für Monat und Jahr)."""
+    config = get_config()
+    return {
+        "settings": settings_payload(config.settings),
+        "custom_holidays": [dict(h) for h in config.custom_holidays],
+        "month": build_month_view(year, month, config),
+        "year": build_year_view(year, config) if with_year else None,
+    }
+
+@app.route('/api/bootstrap', methods=['GET'])
+def get_bootstrap():
+    today = date.today()
+    year = request.args.get('year', today.year, type=int)
+    month = request.args.get('month', today.month, type=int)
+    with_year = request.args.get('with_year', '0') in ('1', 'true')
+    if not (1900 <= year <= 2999 and 1 <= month <= 12): return jsonify({"success": False, "message": "Ungültiger Monat"}), 400
+    # Das Jahr hängt an allen Monaten bis Dezember, der Monat nur an sich selbst und den Vormonaten
+    through_month = f"{year}-12" if with_year else f"{year}-{month:02d}"
+    return cached_json_response(('bootstrap', year, month, int(with_year)), through_month,
+                                lambda: build_bootstrap(year, month, with_year))
+
+@app.route('/api/changes', methods=['GET'])
+def get_changes():
+    """
+    Änderungsprotokoll seit einer Sequenznummer (Client-Cache in IndexedDB).
+    stale_from = frühester betroffener Monat; wegen des GLZ-Übertrags sind auch alle späteren Monate veraltet.
+    Ohne 'since' oder wenn der Stand nicht mehr lückenlos vorliegt: reset=true -> Client verwirft seinen Cache.
+    """
+    since = request.args.get('since', type=int)
+    latest, oldest = db.session.query(func.max(ChangeLog.seq), func.min(ChangeLog.seq)).one()
+    latest = latest or 0
+    if since is None or since > latest or (oldest is not None and since < oldest - 1):
+        resp = jsonify({"seq": latest, "reset": True, "more": False, "stale_from": ALL_MONTHS, "changes": []})
+    else:
+        rows, more = load_changes(since)
+        resp = jsonify({
+            "seq": rows[-1].seq if rows else since, "reset": False, "more": more, "stale_from": changes_stale_from(rows),
+            "changes": [{"seq": r.seq, "table": r.table_name, "row_id": r.row_id, "op": r.op, "date": r.date} for r in rows]
         })
-    return jsonify(data)
+    resp.headers['Cache-Control'] = 'no-store'
+    return resp
+
+# --- LIVE-UPDATES (SSE) ---
+EVENTS_POLL_INTERVAL = float(os.environ.get('EVENTS_POLL_INTERVAL', 1.0))
+EVENTS_HEARTBEAT = 15
+# Streams werden regelmäßig beendet (EventSource verbindet mit Last-Event-ID neu) -> kein Thread hängt ewig
+EVENTS_STREAM_MAX_AGE = 300
+EVENTS_RETRY_MS = 3000
+
+class ChangeNotifier:
+    """
+    Verteilt neue Einträge des Änderungsprotokolls an die SSE-Streams dieses Worker-Prozesses.
+    Die Worker-übergreifende Verteilung übernimmt SQLite selbst: ein Thread je Worker pollt change_log
+    (PK-Bereich, im WAL-Modus ohne Sperren) - aber nur, solange mindestens ein Stream offen ist.
+    """
+    def __init__(self, interval=EVENTS_POLL_INTERVAL, history=256):
+        self.interval = interval
+        self.cond = threading.Condition()
+        self.seq = None
+        self.recent = deque(maxlen=history) # (erste seq, letzte seq, stale_from) je Poll
+        self.subscribers = 0
+        self.thread = None
+
+    def subscribe(self):
+        with self.cond:
+            self.subscribers += 1
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, daemon=True, name="change-notifier")
+                self.thread.start()
+
+    def unsubscribe(self):
+        with self.cond: self.subscribers -= 1
+
+    def poll(self):
+        """Liest neue Protokollzeilen und weckt die wartenden Streams."""
+        with app.app_context():
+            if self.seq is None:
+                latest = db.session.query(func.max(ChangeLog.seq)).scalar() or 0
+                with self.cond:
+                    self.seq = latest
+                    self.cond.notify_all()
+                return
+            more = True
+            while more:
+                rows, more = load_changes(self.seq)
+                if not rows: break
+                with self.cond:
+                    self.recent.append((rows[0].seq, rows[-1].seq, changes_stale_from(rows)))
+                    self.seq = rows[-1].seq
+                    self.cond.notify_all()
+
+    def run(self):
+        while True:
+            with self.cond:
+                if self.subscribers <= 0:
+                    self.thread = None
+                    return
+            try: self.poll()
+            except Exception as e: app.logger.warning(f"Änderungs-Poll fehlgeschlagen: {e}")
+            time.sleep(self.interval)
+
+    def pending_since(self, after_seq):
+        """(neueste seq, stale_from) für alles nach after_seq oder None. Nicht mehr lückenlos bekannt -> alle Monate."""
+        if self.seq is None or self.seq <= after_seq: return None
+        batches = [b for b in self.recent if b[1] > after_seq]
+        if not batches or batches[0][0] > after_seq + 1: return self.seq, ALL_MONTHS
+        return self.seq, min(b[2] for b in batches)
+
+    def wait(self, after_seq, timeout):
+        with self.cond:
+            self.cond.wait_for(lambda: self.pending_since(after_seq) is not None, timeout)
+            return self.pending_since(after_seq)
+
+notifier = ChangeNotifier()
+
+def sse_message(event, seq, data):
+    return f"id: {seq}\nevent: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.route('/api/events', methods=['GET'])
+def event_stream():
+    """
+    SSE-Stream: 'invalidate' mit {"seq", "stale_from"}, sobald irgendein Worker Änderungen committet hat
+    (stale_from und alle späteren Monate sind veraltet). Wiederaufnahme über Last-Event-ID.
+    """
+    after_seq = request.headers.get('Last-Event-ID', type=int)
+    if after_seq is None: after_seq = db.session.query(func.max(ChangeLog.seq)).scalar() or 0
+
+    def generate(after_seq):
+        # Anmelden erst beim ersten Lesen: bricht der Client vorher ab, bleibt kein Abonnent hängen
+        notifier.subscribe()
+        try:
+            yield f"retry: {EVENTS_RETRY_MS}\n" + sse_message('hello', after_seq, {"seq": after_seq})
+            deadline = time.monotonic() + EVENTS_STREAM_MAX_AGE
+            while time.monotonic() < deadline:
+                pending = notifier.wait(after_seq, EVENTS_HEARTBEAT)
+                if pending is None:
+                    yield ": ping\n\n"
+                    continue
+                after_seq, stale_from = pending
+                yield sse_message('invalidate', after_seq, {"seq": after_seq, "stale_from": stale_from})
+        finally:
+            notifier.unsubscribe()
+
+    resp = app.response_class(generate(after_seq), mimetype='text/event-stream')
+    resp.headers['Cache-Control'] = 'no-store'
+    resp.headers['X-Accel-Buffering'] = 'no' # Reverse-Proxy (nginx) soll nicht puffern
+    return resp
+
+# --- EINTRÄGE ---
+def apply_entry_fields(entry, d):
+    """Übernimmt Typ, Zeiten, Kommentar und (falls mitgesendet) GLZ-Override aus dem Request."""
+    entry.type = d.get('type')
+    entry.start_time = normalize_time_str(d.get('start'))
+    entry.end_time = normalize_time_str(d.get('end'))
+    entry.comment = d.get('comment').strip() if d.get('comment') else ''
+    
+    if 'glz_override' in d:
+        val = d.get('glz_override')
+        if val is not None and str(val).strip() != '': entry.glz_override = float(val)
+        else: entry.glz_override = None
+
+def is_empty_entry(entry):
+    """Leere Einträge (kein Typ, keine Zeit, kein Kommentar, kein Override) werden gelöscht statt gespeichert."""
+    has_override = getattr(entry, 'glz_override', None) is not None
+    return not entry.type and not entry.start_time and not entry.comment and not has_override
+
+def validate_entry_payload(d):
+    """Prüft einen Eintrag aus einem Batch. Liefert die Fehlermeldung oder None."""
+    if not isinstance(d, dict): return "Ungültiger Eintrag"
+    if not is_valid_date(d.get('date')): return "Ungültiges Datum"
+    if d.get('type') not in VALID_TYPES: return "Ungültiger Typ"
+    for key in ('start', 'end'):
+        raw = d.get(key)
+        if raw and not is_valid_time(normalize_time_str(raw) or raw): return "Ungültige Zeit"
+    val = d.get('glz_override')
+    if val is not None and str(val).strip() != '':
+        try: float(val)
+        except (TypeError, ValueError): return "Ungültiger GLZ-Wert"
+    return None
 
 @app.route('/api/entry', methods=['POST'])
 def save_entry():
@@ -538,32 +1235,207 @@ def save_entry():
         entry = WorkEntry(date=d.get('date'))
         db.session.add(entry)
 
-    entry.type = d.get('type')
-    entry.start_time = normalize_time_str(d.get('start'))
-    entry.end_time = normalize_time_str(d.get('end'))
-    entry.comment = d.get('comment').strip() if d.get('comment') else ''
-    
-    if 'glz_override' in d:
-        val = d.get('glz_override')
-        if val is not None and str(val).strip() != '': entry.glz_override = float(val)
-        else: entry.glz_override = None
-    
-    has_override = getattr(entry, 'glz_override', None) is not None
-    if not entry.type and not entry.start_time and not entry.comment and not has_override:
+    apply_entry_fields(entry, d)
+    date_str = entry.date
+    # Vor mark_data_changed bestimmen: dessen Abfragen lösen den Autoflush aus und vergeben die ID
+    op = 'update' if entry.id is not None else 'insert'
+    mark_data_changed(date_str)
+    if is_empty_entry(entry):
+         if op == 'update': log_changes('work_entry', 'delete', [(entry.id, date_str)])
          db.session.delete(entry)
          db.session.commit()
-         return jsonify({"success": True, "id": None})
+         result = {"success": True, "id": None}
+    else:
+        db.session.flush()
+        log_changes('work_entry', op, [(entry.id, date_str)])
+        db.session.commit()
+        if entry.type == 'planned': convert_written_planned([date_str])
+        result = {"success": True, "id": entry.id}
     
-    db.session.commit()
-    return jsonify({"success": True, "id": entry.id})
+    # Optional: nur die geänderten Teile der Monatsansicht zurückgeben statt kompletten Reload
+    # (nicht für Altbestand mit unmöglichem Tag - der Client lädt dann komplett neu)
+    if d.get('delta') and is_valid_date(date_str): result["delta"] = build_day_delta(date_str)
+    result["change_seqs"] = written_change_seqs()
+    return jsonify(result)
 
 @app.route('/api/entry/<int:id>', methods=['DELETE'])
 def delete_entry(id):
     entry = db.session.get(WorkEntry, id)
+    result = {"success": True}
     if entry:
+        date_str = entry.date
+        mark_data_changed(date_str)
+        log_changes('work_entry', 'delete', [(id, date_str)])
         db.session.delete(entry)
         db.session.commit()
-    return jsonify({"success": True})
+        if request.args.get('delta') and is_valid_date(date_str): result["delta"] = build_day_delta(date_str)
+    result["change_seqs"] = written_change_seqs()
+    return jsonify(result)
+
+@app.route('/api/entries/batch', methods=['POST'])
+def batch_entries():
+    """
+    Mehrere Upserts und Löschungen (auch über mehrere Tage) in einer Transaktion.
+    Body: {"upserts": [{id?, date, type, start, end, comment, glz_override}], "deletes": [id, ...]}
+    """
+    d = request.json
+    if not d: return jsonify({"success": False, "message": "Keine Daten empfangen"}), 400
+    upserts, deletes = d.get('upserts') or [], d.get('deletes') or []
+    if not isinstance(upserts, list) or not isinstance(deletes, list):
+        return jsonify({"success": False, "message": "upserts/deletes müssen Listen sein"}), 400
+    
+    # Erst alles prüfen, dann schreiben: ein fehlerhafter Eintrag verwirft den ganzen Batch
+    for idx, u in enumerate(upserts):
+        error = validate_entry_payload(u)
+        entry_id = u.get('id')
+        if not error and entry_id is not None and (not isinstance(entry_id, int) or isinstance(entry_id, bool)):
+            error = "Ungültige ID"
+        if error: return jsonify({"success": False, "message": f"Eintrag {idx + 1}: {error}", "index": idx}), 400
+    if not all(isinstance(i, int) and not isinstance(i, bool) for i in deletes):
+        return jsonify({"success": False, "message": "Ungültige ID in deletes"}), 400
+
+    upsert_ids = {u['id'] for u in upserts if u.get('id')}
+    if upsert_ids & set(deletes):
+        return jsonify({"success": False, "message": "Eintrag kann nicht gleichzeitig geändert und gelöscht werden"}), 400
+
+    ids = upsert_ids | set(deletes)
+    existing = {e.id: e for e in WorkEntry.query.filter(WorkEntry.id.in_(ids)).all()} if ids else {}
+    for idx, u in enumerate(upserts):
+        if u.get('id') and u['id'] not in existing:
+            return jsonify({"success": False, "message": f"Eintrag {idx + 1}: Nicht gefunden", "index": idx}), 404
+
+    try:
+        touched_dates, removed = [], []
+        for entry_id in deletes:
+            entry = existing.get(entry_id)
+            if entry is None: continue
+            touched_dates.append(entry.date)
+            removed.append((entry.id, entry.date))
+            db.session.delete(entry)
+
+        pending, new_entries, updated = [], [], []
+        for u in upserts:
+            entry = existing[u['id']] if u.get('id') else WorkEntry(date=u['date'])
+            apply_entry_fields(entry, u)
+            touched_dates.append(entry.date)
+            if is_empty_entry(entry):
+                if entry.id is not None:
+                    removed.append((entry.id, entry.date))
+                    db.session.delete(entry)
+                pending.append(None)
+            else:
+                if entry.id is None: db.session.add(entry)
+                (new_entries if entry.id is None else updated).append(entry)
+                pending.append(entry)
+        deleted = len(removed)
+
+        if touched_dates: mark_data_changed(min(touched_dates))
+        db.session.flush()
+        log_changes('work_entry', 'delete', removed)
+        log_changes('work_entry', 'insert', [(e.id, e.date) for e in new_entries])
+        log_changes('work_entry', 'update', [(e.id, e.date) for e in updated])
+        db.session.commit()
+        convert_written_planned([e.date for e in pending if e and e.type == 'planned'])
+    except Exception as e:
+        db.session.rollback()
+        app.logger.error(f"Batch-Speichern fehlgeschlagen: {e}", exc_info=True)
+        return jsonify({"success": False, "message": "Fehler beim Speichern"}), 500
+
+    return jsonify({"success": True, "ids": [e.id if e else None for e in pending], "deleted": deleted,
+                    "change_seqs": written_change_seqs()})
+
+# --- SERIENPLANUNG ---
+def plan_series_dates(start_date, end_date, weekdays, config):
+    """
+    Zieltage der Serienplanung in einem Durchlauf über die gecachten Jahreskalender: gewählte Wochentage,
+    ohne freie Tage und Feiertage (inkl. eigener). 24.12./31.12. bleiben wie bisher planbar,
+    sofern dort kein eigener Feiertag eingetragen ist.
+    """
+    weekdays, dates = set(weekdays), []
+    for year in range(start_date.year, end_date.year + 1):
+        cal = get_year_calendar(year, config.settings, config.custom_map)
+        first, last = max(start_date, date(year, 1, 1)), min(end_date, date(year, 12, 31))
+        for ordinal in range(first.toordinal(), last.toordinal() + 1):
+            d = date.fromordinal(ordinal)
+            if d.weekday() not in weekdays: continue
+            flags = cal.flags[ordinal - cal.first_ordinal]
+            if flags & FLAG_OFF_DAY: continue
+            if not flags & FLAG_WORKDAY and not (d.month == 12 and d.day in (24, 31) and d not in config.custom_map): continue
+            dates.append(str(d))
+    return dates
+
+def plan_series_impact(target_type, created, overwritten, config):
+    """
+    Auswirkung einer Serienplanung je betroffenem Monat, ohne zu schreiben: HO-Stunden gegenüber dem
+    HO-Kontingent und GLZ-Saldo am Monatsende, jeweils vorher/nachher (gleiche Regeln wie die Monatsansicht).
+    """
+    if not created: return []
+    first = date.fromisoformat(min(created)).replace(day=1)
+    last_day = date.fromisoformat(max(created))
+    last = last_day.replace(day=calendar.monthrange(last_day.year, last_day.month)[1])
+    settings = config.settings
+
+    # Ist-Zustand je Tag: Typen, HO-/Büro-Netto, Anzahl geplanter Einträge, GLZ-Override
+    old_days = {}
+    rows = db.session.query(
+        WorkEntry.date, WorkEntry.type, func.count(WorkEntry.id),
+        func.sum(func.round(WorkEntry.net_minutes / 60.0, 2))
+    ).filter(days_range(first, last)).group_by(WorkEntry.date, WorkEntry.type).all()
+    for d_str, e_type, count, net in rows:
+        day = old_days.setdefault(d_str, {"types": [], "ho": 0.0, "office": 0.0, "planned": 0})
+        day["types"].append(e_type)
+        if e_type == 'planned': day["planned"] += count
+        elif e_type == 'home': day["ho"] += net or 0.0
+        elif e_type in ("office", "dr"): day["office"] += net or 0.0
+    overrides = dict(db.session.query(WorkEntry.date, WorkEntry.glz_override).filter(
+        WorkEntry.date < str(last + timedelta(days=1)), WorkEntry.glz_override.isnot(None)).order_by(WorkEntry.id).all())
+
+    overwritten, new_day = set(overwritten), {"types": [target_type], "ho": 0.0, "office": 0.0, "planned": int(target_type == 'planned')}
+    new_days = dict(old_days, **{d: new_day for d in created})
+    new_overrides = {d: v for d, v in overrides.items() if d not in overwritten}
+
+    def has_anchor(override_map, before):
+        return any(d < before for d in override_map)
+
+    months, before, after = [], None, None
+    month_start = first
+    while month_start <= last:
+        month_end = month_start.replace(day=calendar.monthrange(month_start.year, month_start.month)[1])
+        cal = get_year_calendar(month_start.year, settings, config.custom_map)
+        if before is None:
+            before = after = get_glz_carryover(month_start.year, month_start.month, settings, config.custom_map)
+        elif month_start.month == 1:
+            # Ohne PDF-Anker beginnt der Saldo jedes Jahr bei 0
+            if not has_anchor(overrides, str(month_start)): before = 0.0
+            if not has_anchor(new_overrides, str(month_start)): after = 0.0
+
+        ho = {"before": 0.0, "after": 0.0}
+        workday_target = 0.0
+        for ordinal in range(month_start.toordinal(), month_end.toordinal() + 1):
+            i = ordinal - cal.first_ordinal
+            d_str = str(date.fromordinal(ordinal))
+            is_workday, target = cal.is_workday(i), cal.targets[i]
+            if is_workday: workday_target += target
+            for state, days, override_map in (("before", old_days, overrides), ("after", new_days, new_overrides)):
+                day = days.get(d_str)
+                if day:
+                    day_ho = day["ho"] + day["planned"] * target
+                    ho[state] += day_ho
+                    delta = calculate_glz_delta(is_workday, target, day["types"], day_ho + day["office"])
+                else:
+                    delta = calculate_glz_delta(is_workday, target, [], 0.0)
+                balance = (before if state == "before" else after) + delta
+                if d_str in override_map: balance = override_map[d_str]
+                if state == "before": before = balance
+                else: after = balance
+
+        months.append({
+            "month": month_start.strftime('%Y-%m'), "ho_allowed": round(workday_target * settings.ho_quota_percent / 100, 2),
+            "ho_made": round(ho["before"], 2), "ho_made_after": round(ho["after"], 2),
+            "glz_end": round(before, 2), "glz_end_after": round(after, 2)
+        })
+        month_start = month_end + timedelta(days=1)
+    return months
 
 @app.route('/api/plan/series', methods=['POST'])
 def plan_series():
@@ -577,48 +1449,52 @@ def plan_series():
         weekdays = [int(x) for x in d['weekdays']]
         target_type = d.get('type')
         overwrite = d.get('overwrite', False)
+        dry_run = bool(d.get('dry_run', False))
         
         if target_type not in VALID_TYPES: return jsonify({"success": False, "message": "Ungültiger Typ"}), 400
+        if end_date < start_date: return jsonify({"success": False, "message": "Ungültiger Zeitraum"}), 400
         
-        all_existing = WorkEntry.query.filter(WorkEntry.date >= str(start_date), WorkEntry.date <= str(end_date)).all()
-        existing_by_date = {}
-        for entry in all_existing:
-            if entry.date not in existing_by_date: existing_by_date[entry.date] = []
-            existing_by_date[entry.date].append(entry)
-        
-        curr = start_date
-        while curr <= end_date:
-            if curr.weekday() in weekdays:
-                s_date = str(curr)
-                he_hols = holidays.DE(state='HE', years=curr.year)
-                
-                if curr in he_hols and not (curr.month==12 and curr.day in [24,31]):
-                    curr += timedelta(days=1)
-                    continue
+        config = get_config()
+        target_dates = plan_series_dates(start_date, end_date, weekdays, config)
+        target_set = set(target_dates)
+        ids_by_date = {}
+        for entry_id, d_str in db.session.query(WorkEntry.id, WorkEntry.date).filter(days_range(start_date, end_date)).all():
+            if d_str in target_set: ids_by_date.setdefault(d_str, []).append(entry_id)
 
-                existing_entries_for_day = existing_by_date.get(s_date, [])
-                
-                if overwrite and existing_entries_for_day:
-                    for e in existing_entries_for_day: db.session.delete(e)
-                    existing_entries_for_day = []
-                
-                if not existing_entries_for_day:
-                    db.session.add(WorkEntry(date=s_date, type=target_type))
-            
-            curr += timedelta(days=1)
-            
+        overwritten = [s for s in target_dates if s in ids_by_date] if overwrite else []
+        created = target_dates if overwrite else [s for s in target_dates if s not in ids_by_date]
+
+        if dry_run:
+            return jsonify({
+                "success": True, "dry_run": True, "create": created, "overwrite": overwritten,
+                "kept": [] if overwrite else [s for s in target_dates if s in ids_by_date],
+                "impact": plan_series_impact(target_type, created, overwritten, config)
+            })
+
+        if overwritten:
+            removed = [(i, s) for s in overwritten for i in ids_by_date[s]]
+            WorkEntry.query.filter(WorkEntry.id.in_([i for i, _ in removed])).delete(synchronize_session=False)
+            log_changes('work_entry', 'delete', removed)
+        if created:
+            # Bulk-Insert umgeht die Mapper-Events -> net_minutes (ohne Zeiten = 0) direkt setzen
+            inserted = db.session.execute(insert(WorkEntry).returning(WorkEntry.id, WorkEntry.date),
+                                          [{"date": s, "type": target_type, "net_minutes": 0} for s in created]).all()
+            log_changes('work_entry', 'insert', inserted)
+            mark_data_changed(created[0])
         db.session.commit()
-        return jsonify({"success": True})
+        if target_type == 'planned': convert_written_planned(created)
+        return jsonify({"success": True, "created": len(created), "overwritten": len(overwritten),
+                        "change_seqs": written_change_seqs()})
         
     except Exception as e:
+        db.session.rollback()
         app.logger.error(f"Fehler im Serienplaner: {e}", exc_info=True)
         return jsonify({"success": False, "message": "Ein Fehler ist beim Speichern aufgetreten."}), 400
 
 @app.route('/api/custom-holidays', methods=['GET', 'POST'])
 def handle_custom_holidays():
     if request.method == 'GET':
-        hols = CustomHoliday.query.all()
-        return jsonify(sorted([{'id': h.id, 'date': h.date, 'name': h.name, 'hours': h.hours or 0} for h in hols], key=lambda x: x['date']))
+        return jsonify([dict(h) for h in get_config().custom_holidays])
     
     data = request.json
     if not is_valid_date(data.get('date')): return jsonify({"success": False, "message": "Ungültiges Datum"}), 400
@@ -626,32 +1502,43 @@ def handle_custom_holidays():
     # GEFIXT: ID prüfen, damit Bearbeiten funktioniert und keine Duplikate entstehen
     holiday_id = data.get('id')
     
+    mark_data_changed(data['date'])
     if holiday_id:
         existing = db.session.get(CustomHoliday, holiday_id)
         if existing:
+            mark_data_changed(existing.date)
+            # Verschobener Feiertag betrifft alten und neuen Tag
+            log_changes('custom_holiday', 'update', [(existing.id, existing.date)] if existing.date != data['date'] else [])
             existing.date = data['date']
             existing.name = data['name']
             existing.hours = float(data.get('hours', 0))
-        else:
-            db.session.add(CustomHoliday(date=data['date'], name=data['name'], hours=float(data.get('hours', 0))))
     else:
         existing = CustomHoliday.query.filter_by(date=data['date']).first()
         if existing:
             existing.name = data['name']
             existing.hours = float(data.get('hours', 0))
-        else:
-            db.session.add(CustomHoliday(date=data['date'], name=data['name'], hours=float(data.get('hours', 0))))
+    if existing:
+        log_changes('custom_holiday', 'update', [(existing.id, existing.date)])
+    else:
+        holiday = CustomHoliday(date=data['date'], name=data['name'], hours=float(data.get('hours', 0)))
+        db.session.add(holiday)
+        db.session.flush()
+        log_changes('custom_holiday', 'insert', [(holiday.id, holiday.date)])
         
+    bump_config_version()
     db.session.commit()
-    return jsonify({"success": True})
+    return jsonify({"success": True, "change_seqs": written_change_seqs()})
 
 @app.route('/api/custom-holidays/<int:id>', methods=['DELETE'])
 def delete_custom_holiday(id):
     h = db.session.get(CustomHoliday, id)
     if h: 
+        mark_data_changed(h.date)
+        log_changes('custom_holiday', 'delete', [(h.id, h.date)])
         db.session.delete(h)
+        bump_config_version()
         db.session.commit()
-    return jsonify({"success": True})
+    return jsonify({"success": True, "change_seqs": written_change_seqs()})
 
 @app.route('/api/import/pdf', methods=['POST'])
 def import_pdf():
@@ -660,66 +1547,41 @@ def import_pdf():
     file = request.files['file']
     overwrite = request.form.get('overwrite') == 'true'
     
+    data = file.read()
+    if len(data) > UPLOAD_MAX_FILE_BYTES: return jsonify({"success": False, "message": "Datei ist zu groß"}), 413
+    job_id = enqueue_import_job([(file.filename or 'upload.pdf', data)], overwrite)
+    return jsonify({"success": True, "job_id": job_id, "message": "Import gestartet."}), 202
+
+@app.route('/api/import/batch', methods=['POST'])
+def import_pdf_batch():
+    files = request.files.getlist('files')
+    if not files: return jsonify({"success": False, "message": "Keine Dateien"}), 400
+    overwrite = request.form.get('overwrite') == 'true'
+
     try:
-        settings = Settings.query.first()
-        extracted_entries = parse_pdf_content(file)
-        
-        if not extracted_entries:
-             return jsonify({"success": True, "message": "Keine Einträge gefunden."})
-             
-        y = extracted_entries[0]['date'].year
-        he_holidays = holidays.DE(state='HE', years=y)
-        he_holidays[datetime(y, 12, 24).date()] = "Heiligabend"
-        he_holidays[datetime(y, 12, 31).date()] = "Silvester"
-        custom_map = {datetime.strptime(c.date, "%Y-%m-%d").date(): c for c in CustomHoliday.query.all()}
-
-        cnt = 0
-        entries_by_date = {}
-        for e in extracted_entries:
-            d = e['date']
-            if d not in entries_by_date: entries_by_date[d] = []
-            entries_by_date[d].append(e)
-            
-        for date_obj, entries in entries_by_date.items():
-            date_iso = str(date_obj)
-            day_info = get_day_info(date_obj, settings, he_holidays, custom_map)
-            is_free_day = not day_info["is_workday"]
-            
-            valid_entries = []
-            for e in entries:
-                has_times = bool(e['start'] and e['end'])
-                has_comment = bool(e['comment'])
-                
-                if has_times or not is_free_day or has_comment or e['glz_override'] is not None:
-                    valid_entries.append(e)
-            
-            if not valid_entries: continue
-            
-            if overwrite:
-                WorkEntry.query.filter_by(date=date_iso).delete()
-            
-            for e in valid_entries:
-                if not overwrite:
-                    if e['type'] and WorkEntry.query.filter_by(date=date_iso, type=e['type']).first():
-                        continue
-                
-                en = WorkEntry(date=date_iso, type=e['type'])
-                en.start_time = e['start']
-                en.end_time = e['end']
-                en.comment = e['comment']
-                
-                if e.get('glz_override') is not None:
-                    en.glz_override = e['glz_override']
-                    
-                db.session.add(en)
-                cnt += 1
+        docs = collect_pdf_uploads(files)
+    except zipfile.BadZipFile:
+        return jsonify({"success": False, "message": "Ungültiges ZIP-Archiv"}), 400
+    except ValueError as e:
+        return jsonify({"success": False, "message": str(e)}), 413
+    if not docs: return jsonify({"success": False, "message": "Keine PDF-Dateien gefunden"}), 400
 
-        db.session.commit()
-        return jsonify({"success": True, "message": f"{cnt} Einträge importiert."})
-            
-    except Exception as e: 
-        app.logger.error(f"IMPORT ERROR: {e}", exc_info=True)
-        return jsonify({"success": False, "message": "Fehler beim Import."}), 500
+    job_id = enqueue_import_job(docs, overwrite)
+    return jsonify({"success": True, "job_id": job_id, "message": f"Import von {len(docs)} Dateien gestartet."}), 202
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_import_job(job_id):
+    job = db.session.get(ImportJob, job_id)
+    if not job: return jsonify({"success": False, "message": "Job nicht gefunden"}), 404
+
+    # Worker-Prozess wurde beendet, ohne den Job abzuschließen -> nur melden, festgeschrieben wird woanders
+    if is_stale_job(job): status, result = 'failed', STALE_JOB_RESULT
+    else: status, result = job.status, json.loads(job.result) if job.result else None
+
+    return jsonify({
+        "id": job.id, "status": status,
+        "pages_done": job.pages_done, "pages_total": job.pages_total, "result": result
+    })
 
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5000, debug=False)
\ No newline at end of file
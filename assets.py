@@ -0,0 +1,158 @@
+"""
+Lokale Kopie der Frontend-Bibliotheken (Vue, Vuetify, MDI, Roboto, Chart.js).
+
+Wird beim Image-Build ausgeführt und legt unter static/vendor ab:
+  <name>.<hash>.<ext>       Datei mit Inhalts-Hash im Namen (-> unbegrenzt cachebar)
+  <name>.<hash>.<ext>.gz    vorkomprimierte Varianten (.br zusätzlich, falls brotli installiert ist)
+  manifest.json             CDN-URL -> lokaler Dateiname
+
+index.html referenziert weiterhin die (versionierten) CDN-URLs; existiert das Manifest, ersetzt
+der Server sie beim Ausliefern durch die lokalen Pfade. Ohne Manifest bleibt das CDN der Fallback.
+
+CLI:
+  python assets.py [--dir static/vendor]
+"""
+import os
+import re
+import sys
+import gzip
+import json
+import hashlib
+import argparse
+import mimetypes
+import urllib.request
+from urllib.parse import urljoin, urlsplit
+
+try:
+    import brotli
+except ImportError:  # optional: ohne brotli werden nur .gz-Varianten erzeugt
+    brotli = None
+
+VENDOR_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static', 'vendor')
+MANIFEST_FILE = 'manifest.json'
+VENDOR_URL_PREFIX = '/assets/'
+
+# Exakt so in static/index.html eingetragen (feste Versionen, damit Hash und Inhalt zusammenpassen)
+VENDOR_ASSETS = (
+    'https://fonts.googleapis.com/css2?family=Roboto+Mono:wght@400;500;700&family=Roboto:wght@100;300;400;500;700;900&display=swap',
+    'https://cdn.jsdelivr.net/npm/@mdi/font@6.9.96/css/materialdesignicons.min.css',
+    'https://cdn.jsdelivr.net/npm/vuetify@3.6.14/dist/vuetify.min.css',
+    'https://unpkg.com/vue@3.4.38/dist/vue.global.prod.js',
+    'https://cdn.jsdelivr.net/npm/vuetify@3.6.14/dist/vuetify.min.js',
+    'https://cdn.jsdelivr.net/npm/chart.js@4.4.4/dist/chart.umd.min.js',
+)
+# Google Fonts liefert woff2 nur an Browser aus, die es kennen
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0 Safari/537.36'
+# Bereits komprimierte Formate lohnen keine zweite Kompression
+COMPRESSIBLE_EXT = {'.js', '.css', '.svg', '.ttf', '.eot', '.json'}
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+_CSS_URL_RE = re.compile(r"""url\(\s*(['"]?)([^'")]+)\1\s*\)""")
+_FALLBACK_NAMES = {'fonts.googleapis.com': 'fonts.css'}
+
+
+# --- DOWNLOAD & ABLAGE ---
+
+def fetch(url):
+    req = urllib.request.Request(url, headers={'User-Agent': USER_AGENT})
+    with urllib.request.urlopen(req, timeout=30) as resp:
+        return resp.read()
+
+def asset_basename(url):
+    parts = urlsplit(url)
+    base = os.path.basename(parts.path)
+    # Google Fonts: '/css2?family=...' hat keine Endung
+    return base if os.path.splitext(base)[1] else _FALLBACK_NAMES.get(parts.netloc, 'asset')
+
+def hashed_name(url, data):
+    """'.../vuetify.min.js' -> 'vuetify.min.<sha256[:12]>.js'"""
+    stem, ext = os.path.splitext(asset_basename(url))
+    return f"{stem}.{hashlib.sha256(data).hexdigest()[:12]}{ext}"
+
+def write_asset(vendor_dir, name, data):
+    with open(os.path.join(vendor_dir, name), 'wb') as f: f.write(data)
+    if os.path.splitext(name)[1] not in COMPRESSIBLE_EXT: return
+    # mtime=0 -> identische Eingabe ergibt identische .gz-Datei (reproduzierbarer Build)
+    with open(os.path.join(vendor_dir, name + '.gz'), 'wb') as f: f.write(gzip.compress(data, 9, mtime=0))
+    if brotli is not None:
+        with open(os.path.join(vendor_dir, name + '.br'), 'wb') as f: f.write(brotli.compress(data, quality=11))
+
+def rewrite_css_urls(css, base_url, store):
+    """Lädt alle url(...)-Referenzen eines Stylesheets (Fonts) und ersetzt sie durch die lokalen Namen."""
+    def replace(match):
+        ref = match.group(2).strip()
+        if ref.startswith('data:'): return match.group(0)
+        # Query/Fragment (z.B. '?#iefix&v=6.9.96') gehört nicht zum Dateinamen
+        target = urljoin(base_url, ref).split('#')[0]
+        return f'url({store(target)})'
+    return _CSS_URL_RE.sub(replace, css)
+
+def build_vendor(vendor_dir=VENDOR_DIR, urls=VENDOR_ASSETS, fetch=fetch):
+    """Lädt alle Assets, schreibt die gehashten Dateien samt Varianten und das Manifest. Gibt das Manifest zurück."""
+    os.makedirs(vendor_dir, exist_ok=True)
+    stored = {}
+
+    def store(url):
+        if url in stored: return stored[url]
+        data = fetch(url)
+        if asset_basename(url).endswith('.css'):
+            data = rewrite_css_urls(data.decode('utf-8'), url, store).encode('utf-8')
+        name = hashed_name(url, data)
+        write_asset(vendor_dir, name, data)
+        stored[url] = name
+        return name
+
+    manifest = {url: store(url) for url in urls}
+    # Reste früherer Builds entfernen (alte Hashes werden nie mehr referenziert)
+    keep = set(stored.values()) | {MANIFEST_FILE}
+    for fname in os.listdir(vendor_dir):
+        base = fname[:-3] if fname.endswith(('.gz', '.br')) else fname
+        if base not in keep: os.remove(os.path.join(vendor_dir, fname))
+    with open(os.path.join(vendor_dir, MANIFEST_FILE), 'w') as f: json.dump(manifest, f, indent=2)
+    return manifest
+
+
+# --- AUSLIEFERUNG ---
+
+def load_manifest(vendor_dir=VENDOR_DIR):
+    try:
+        with open(os.path.join(vendor_dir, MANIFEST_FILE)) as f: return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def localize_html(html, manifest, prefix=VENDOR_URL_PREFIX):
+    """Ersetzt die CDN-URLs im HTML durch die lokalen, gehashten Pfade."""
+    for url, name in manifest.items():
+        html = html.replace(url, prefix + name).replace(url.replace('&', '&amp;'), prefix + name)
+    return html
+
+def select_variant(vendor_dir, filename, accept_encoding):
+    """
+    Wählt die beste vorkomprimierte Variante, die der Client akzeptiert.
+    Gibt (Dateiname relativ zu vendor_dir, Content-Encoding oder None) zurück.
+    """
+    accepted = {token.split(';')[0].strip().lower() for token in (accept_encoding or '').split(',')}
+    for encoding, suffix in ENCODINGS:
+        if encoding in accepted and os.path.isfile(os.path.join(vendor_dir, filename + suffix)):
+            return filename + suffix, encoding
+    return filename, None
+
+def guess_mimetype(filename):
+    if filename.endswith('.woff2'): return 'font/woff2'
+    return mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Frontend-Bibliotheken lokal ablegen')
+    parser.add_argument('--dir', default=VENDOR_DIR)
+    args = parser.parse_args(argv)
+    try:
+        manifest = build_vendor(args.dir)
+    except OSError as e:
+        print(f"Assets konnten nicht geladen werden ({e})", file=sys.stderr)
+        return 1
+    print(f"{len(manifest)} Assets nach {args.dir} geschrieben (brotli: {'ja' if brotli else 'nein'})")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,298 @@
+"""
+Tägliche Datenbank-Backups als inhaltsadressierter Chunk-Store.
+
+Aufbau von data/backups:
+  chunks/ab/<sha256>       zlib-komprimierter 64-KiB-Block der Datenbankdatei (nur einmal gespeichert)
+  manifests/YYYY-MM-DD.json  Liste der Block-Hashes eines Tages-Snapshots
+
+CLI (neben migrate.py):
+  python backup.py list
+  python backup.py verify [YYYY-MM-DD]
+  python backup.py restore YYYY-MM-DD ZIELDATEI [--force]
+"""
+import os
+import sys
+import json
+import gzip
+import zlib
+import shutil
+import sqlite3
+import hashlib
+import tempfile
+import threading
+import time
+import argparse
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+try:
+    import fcntl
+except ImportError:  # Windows: kein prozessübergreifendes Lock verfügbar
+    fcntl = None
+
+BACKUP_RETENTION_DAYS = 180
+BACKUP_PREFIX = 'db_backup_'
+LOCK_FILE = '.backup.lock'
+# SQLite ändert Seiten an fester Position -> feste Block-Grenzen (Vielfaches der Seitengröße) genügen
+CHUNK_SIZE = 64 * 1024
+
+
+# --- CHUNK-STORE ---
+def _chunk_path(backup_dir, digest):
+    return os.path.join(backup_dir, 'chunks', digest[:2], digest)
+
+def _manifest_path(backup_dir, day_str):
+    return os.path.join(backup_dir, 'manifests', f'{day_str}.json')
+
+def _write_atomic(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f: f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp): os.remove(tmp)
+        raise
+
+def store_snapshot(raw_path, backup_dir, day_str):
+    """
+    Zerlegt eine Datenbankdatei in Blöcke, speichert nur noch unbekannte Blöcke und schreibt das Manifest.
+    Gibt das Manifest zurück (inkl. Anzahl neu geschriebener Blöcke).
+    """
+    chunks, new_chunks, file_hash, size = [], 0, hashlib.sha256(), 0
+    with open(raw_path, 'rb') as f:
+        while True:
+            block = f.read(CHUNK_SIZE)
+            if not block: break
+            size += len(block)
+            file_hash.update(block)
+            digest = hashlib.sha256(block).hexdigest()
+            chunks.append(digest)
+            path = _chunk_path(backup_dir, digest)
+            if not os.path.exists(path):
+                _write_atomic(path, zlib.compress(block, 6))
+                new_chunks += 1
+
+    manifest = {"date": day_str, "created": datetime.now().isoformat(timespec='seconds'),
+                "size": size, "sha256": file_hash.hexdigest(), "chunk_size": CHUNK_SIZE, "chunks": chunks}
+    _write_atomic(_manifest_path(backup_dir, day_str), json.dumps(manifest).encode('utf-8'))
+    manifest["new_chunks"] = new_chunks
+    return manifest
+
+def load_manifest(backup_dir, day_str):
+    path = _manifest_path(backup_dir, day_str)
+    if not os.path.exists(path): return None
+    with open(path, 'r', encoding='utf-8') as f: return json.load(f)
+
+def list_snapshots(backup_dir):
+    """Alle Tage mit Manifest, aufsteigend."""
+    manifest_dir = os.path.join(backup_dir, 'manifests')
+    if not os.path.isdir(manifest_dir): return []
+    return sorted(name[:-5] for name in os.listdir(manifest_dir) if name.endswith('.json'))
+
+def read_chunk(backup_dir, digest):
+    """Liest und prüft einen Block; ValueError bei fehlendem oder beschädigtem Block."""
+    try:
+        with open(_chunk_path(backup_dir, digest), 'rb') as f: block = zlib.decompress(f.read())
+    except FileNotFoundError:
+        raise ValueError(f"Block {digest[:12]} fehlt")
+    except zlib.error:
+        raise ValueError(f"Block {digest[:12]} nicht lesbar")
+    if hashlib.sha256(block).hexdigest() != digest: raise ValueError(f"Block {digest[:12]} beschädigt")
+    return block
+
+def restore_snapshot(backup_dir, day_str, target_path):
+    """Setzt den Snapshot eines Tages wieder zusammen und prüft die Gesamt-Prüfsumme (atomar)."""
+    manifest = load_manifest(backup_dir, day_str)
+    if manifest is None: raise ValueError(f"Kein Backup für {day_str}")
+    target_dir = os.path.dirname(os.path.abspath(target_path))
+    fd, tmp = tempfile.mkstemp(dir=target_dir, suffix='.restore.tmp')
+    try:
+        file_hash = hashlib.sha256()
+        with os.fdopen(fd, 'wb') as out:
+            for digest in manifest["chunks"]:
+                block = read_chunk(backup_dir, digest)
+                file_hash.update(block)
+                out.write(block)
+        if file_hash.hexdigest() != manifest["sha256"]: raise ValueError("Prüfsumme der Datenbank stimmt nicht")
+        os.replace(tmp, target_path)
+    except BaseException:
+        if os.path.exists(tmp): os.remove(tmp)
+        raise
+
+def verify_snapshot(backup_dir, day_str):
+    """Liefert eine Liste der Fehler eines Snapshots (leer = in Ordnung)."""
+    manifest = load_manifest(backup_dir, day_str)
+    if manifest is None: return [f"Kein Backup für {day_str}"]
+    errors, file_hash = [], hashlib.sha256()
+    for digest in manifest["chunks"]:
+        try: file_hash.update(read_chunk(backup_dir, digest))
+        except ValueError as e: errors.append(str(e))
+    if not errors and file_hash.hexdigest() != manifest["sha256"]: errors.append("Prüfsumme der Datenbank stimmt nicht")
+    return errors
+
+
+# --- SNAPSHOT & AUFRÄUMEN ---
+def snapshot_database(db_path, backup_dir, day_str):
+    """
+    Erstellt einen konsistenten Snapshot über die Online-Backup-API von SQLite (seitenweise,
+    auch während andere Prozesse schreiben) und legt ihn dedupliziert im Chunk-Store ab.
+    """
+    fd, raw_tmp = tempfile.mkstemp(dir=backup_dir, suffix='.db.tmp')
+    os.close(fd)
+    try:
+        src = sqlite3.connect(db_path)
+        dst = sqlite3.connect(raw_tmp)
+        try:
+            with dst: src.backup(dst)
+        finally:
+            dst.close()
+            src.close()
+        return store_snapshot(raw_tmp, backup_dir, day_str)
+    finally:
+        os.remove(raw_tmp)
+
+def prune_backups(backup_dir, retention_days=BACKUP_RETENTION_DAYS, today=None, logger=None):
+    """
+    Löscht Manifeste und alte Voll-Kopien (db_backup_*) jenseits der Aufbewahrungsfrist
+    und danach alle Blöcke, die kein Manifest mehr referenziert.
+    """
+    cutoff = (today or datetime.now().date()) - timedelta(days=retention_days)
+    cutoff_day, cutoff_ts = str(cutoff), datetime.combine(cutoff, datetime.min.time()).timestamp()
+    removed = []
+    for day_str in list_snapshots(backup_dir):
+        if day_str < cutoff_day:
+            os.remove(_manifest_path(backup_dir, day_str))
+            removed.append(day_str)
+    with os.scandir(backup_dir) as it:
+        for f in it:
+            if f.name.startswith(BACKUP_PREFIX) and f.is_file() and f.stat().st_mtime < cutoff_ts:
+                os.remove(f.path)
+                removed.append(f.name)
+    if logger and removed: logger.info(f"Alte Backups gelöscht (>{retention_days} Tage): {', '.join(removed)}")
+
+    chunk_dir = os.path.join(backup_dir, 'chunks')
+    if removed and os.path.isdir(chunk_dir):
+        referenced = set()
+        for day_str in list_snapshots(backup_dir): referenced.update(load_manifest(backup_dir, day_str)["chunks"])
+        for sub in os.listdir(chunk_dir):
+            for name in os.listdir(os.path.join(chunk_dir, sub)):
+                if name not in referenced: os.remove(os.path.join(chunk_dir, sub, name))
+    return removed
+
+
+# --- TAGES-BACKUP MIT LOCK ---
+@contextmanager
+def backup_lock(backup_dir):
+    """Nicht-blockierendes Datei-Lock: liefert False, wenn ein anderer Prozess gerade sichert."""
+    if fcntl is None:
+        yield True
+        return
+    with open(os.path.join(backup_dir, LOCK_FILE), 'a') as lock_file:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+def run_daily_backup(db_path, backup_dir, logger=None, today=None):
+    """
+    Erstellt das Backup für heute, falls noch keins existiert, und räumt alte Backups auf.
+    Gibt das Manifest des neuen Backups zurück (None = nichts zu tun oder anderer Prozess aktiv).
+    """
+    if not os.path.exists(db_path): return None
+    today = today or datetime.now().date()
+    today_str = today.strftime('%Y-%m-%d')
+    legacy_file = os.path.join(backup_dir, f'{BACKUP_PREFIX}{today_str}.db')
+
+    with backup_lock(backup_dir) as acquired:
+        if not acquired: return None
+        if load_manifest(backup_dir, today_str) is not None or os.path.exists(legacy_file): return None
+        manifest = snapshot_database(db_path, backup_dir, today_str)
+        if logger: logger.info(f"Tägliches Datenbank-Backup erstellt: {today_str} ({manifest['new_chunks']}/{len(manifest['chunks'])} Blöcke neu)")
+        prune_backups(backup_dir, today=today, logger=logger)
+        return manifest
+
+
+# --- SCHEDULER ---
+_scheduler_lock = threading.Lock()
+_scheduler_thread = None
+
+def start_backup_scheduler(db_path, backup_dir, logger=None, interval=3600):
+    """
+    Startet (einmal pro Prozess) einen Daemon-Thread, der regelmäßig prüft, ob das Tages-Backup fällig ist.
+    Mehrere Gunicorn-Worker sind unkritisch: das Datei-Lock lässt immer nur einen sichern.
+    """
+    global _scheduler_thread
+    with _scheduler_lock:
+        if _scheduler_thread is not None and _scheduler_thread.is_alive(): return _scheduler_thread
+
+        def loop():
+            while True:
+                try:
+                    run_daily_backup(db_path, backup_dir, logger)
+                except Exception as e:
+                    if logger: logger.error(f"Fehler beim DB-Backup: {e}", exc_info=True)
+                time.sleep(interval)
+
+        _scheduler_thread = threading.Thread(target=loop, name='db-backup', daemon=True)
+        _scheduler_thread.start()
+        return _scheduler_thread
+
+
+# --- CLI ---
+def restore_legacy(backup_dir, day_str, target_path):
+    """Stellt eine alte Voll-Kopie (db_backup_*.db bzw. .db.gz) wieder her. False = nicht vorhanden."""
+    for suffix, opener in (('.db', open), ('.db.gz', gzip.open)):
+        path = os.path.join(backup_dir, f'{BACKUP_PREFIX}{day_str}{suffix}')
+        if os.path.exists(path):
+            with opener(path, 'rb') as f_in, open(target_path, 'wb') as f_out: shutil.copyfileobj(f_in, f_out)
+            return True
+    return False
+
+def main(argv=None):
+    default_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'backups')
+    parser = argparse.ArgumentParser(description="Datenbank-Backups auflisten, prüfen und wiederherstellen")
+    parser.add_argument('--dir', default=default_dir, help="Backup-Verzeichnis (Standard: data/backups)")
+    sub = parser.add_subparsers(dest='command', required=True)
+    sub.add_parser('list', help="Vorhandene Snapshots anzeigen")
+    p_verify = sub.add_parser('verify', help="Blöcke und Prüfsummen kontrollieren")
+    p_verify.add_argument('day', nargs='?', help="YYYY-MM-DD (Standard: alle)")
+    p_restore = sub.add_parser('restore', help="Snapshot eines Tages als Datenbankdatei schreiben")
+    p_restore.add_argument('day')
+    p_restore.add_argument('target')
+    p_restore.add_argument('--force', action='store_true', help="Vorhandene Zieldatei überschreiben")
+    args = parser.parse_args(argv)
+
+    if args.command == 'list':
+        for day_str in list_snapshots(args.dir):
+            m = load_manifest(args.dir, day_str)
+            print(f"{day_str}  {m['size'] / 1024:.0f} KiB  {len(m['chunks'])} Blöcke")
+        return 0
+
+    if args.command == 'verify':
+        failed = 0
+        for day_str in ([args.day] if args.day else list_snapshots(args.dir)):
+            errors = verify_snapshot(args.dir, day_str)
+            print(f"{day_str}: {'OK' if not errors else 'FEHLER - ' + '; '.join(errors)}")
+            failed += bool(errors)
+        return 1 if failed else 0
+
+    if os.path.exists(args.target) and not args.force:
+        print(f"Zieldatei {args.target} existiert bereits (--force zum Überschreiben)")
+        return 1
+    try:
+        if load_manifest(args.dir, args.day) is not None: restore_snapshot(args.dir, args.day, args.target)
+        elif not restore_legacy(args.dir, args.day, args.target): raise ValueError(f"Kein Backup für {args.day}")
+    except ValueError as e:
+        print(f"Wiederherstellung fehlgeschlagen: {e}")
+        return 1
+    print(f"Backup vom {args.day} nach {args.target} wiederhergestellt")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,67 @@
+"""
+Micro-Benchmark: Netto-Arbeitszeit (alt: strptime/timedelta je Aufruf, neu: Minuten-Kernel mit Nachschlagetabelle).
+Prüft vorab, dass alt und neu für alle Präsenzdauern (jede 7. Startminute x jede Endminute) sowie zufällige
+Benutzereingaben identisch rechnen.
+
+Aufruf: python benchmarks/bench_net_minutes.py [anzahl_eintraege]
+"""
+import os
+import sys
+import random
+import timeit
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from logic import normalize_time_str, calculate_net_hours, calculate_net_minutes, parse_time_minutes, net_minutes_batch
+
+def legacy_calculate_net_hours(start_str, end_str):
+    # Stand vor der Umstellung, 1:1 übernommen (ohne print im Fehlerfall)
+    start_str = normalize_time_str(start_str)
+    end_str = normalize_time_str(end_str)
+    if not start_str or not end_str: return 0.0
+    try:
+        t_start = datetime.strptime(start_str, "%H:%M")
+        t_end = datetime.strptime(end_str, "%H:%M")
+        if t_end < t_start: t_end += timedelta(days=1)
+        hours_worked = (t_end - t_start).total_seconds() / 3600.0
+        if hours_worked <= 6.0: net_hours = hours_worked
+        elif hours_worked <= 6.5: net_hours = 6.0
+        elif hours_worked <= 9.5: net_hours = hours_worked - 0.5
+        elif hours_worked <= 9.75: net_hours = 9.0
+        else: net_hours = hours_worked - 0.75
+        return max(0.0, round(net_hours, 2))
+    except Exception:
+        return 0.0
+
+def legacy_calculate_net_minutes(start_str, end_str):
+    return int(round(legacy_calculate_net_hours(start_str, end_str) * 60))
+
+def random_inputs(count, seed=7):
+    rnd = random.Random(seed)
+    odd = ["", None, "8", "800", "0800", "8.30", " 17:45 ", "25:00", "08:60", "abc", "-1:00", "12345"]
+    def t():
+        if rnd.random() < 0.1: return rnd.choice(odd)
+        return f"{rnd.randint(0, 23):02d}:{rnd.randint(0, 59):02d}"
+    return [(t(), t()) for _ in range(count)]
+
+if __name__ == '__main__':
+    # Jede Dauer 0..1439 Min. kommt für jede geprüfte Startminute vor (inkl. über Mitternacht)
+    times = [f"{m // 60:02d}:{m % 60:02d}" for m in range(1440)]
+    for s in times[::7]:
+        for e in times:
+            assert legacy_calculate_net_hours(s, e) == calculate_net_hours(s, e), (s, e)
+    pairs = random_inputs(int(sys.argv[1]) if len(sys.argv) > 1 else 5000)
+    for s, e in pairs:
+        assert legacy_calculate_net_hours(s, e) == calculate_net_hours(s, e), (s, e)
+        assert legacy_calculate_net_minutes(s, e) == calculate_net_minutes(s, e), (s, e)
+
+    starts = [parse_time_minutes(s) for s, _ in pairs]
+    ends = [parse_time_minutes(e) for _, e in pairs]
+    cases = (
+        ("alt  (Stunden, strptime)", lambda: [legacy_calculate_net_minutes(s, e) for s, e in pairs]),
+        ("neu  (Strings, Kernel)", lambda: [calculate_net_minutes(s, e) for s, e in pairs]),
+        ("neu  (Batch, Minuten)", lambda: net_minutes_batch(starts, ends)),
+    )
+    for label, fn in cases:
+        best = min(timeit.repeat(fn, number=20, repeat=5))
+        print(f"{label}: {best * 1000 / 20:.2f} ms pro {len(pairs)} Einträge")
@@ -0,0 +1,63 @@
+"""
+Micro-Benchmark: Zeilen-Klassifikation des PDF-Parsers (alt: Inline-Regex je Zeile, neu: classify_row).
+Prüft vorab, dass beide Varianten für zufällige Zeilen identische Ergebnisse liefern.
+
+Aufruf: python benchmarks/bench_pdf_rows.py [anzahl_zeilen]
+"""
+import os
+import re
+import sys
+import random
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from pdf_parser import TYPE_MAP, classify_row
+
+def legacy_classify_row(row):
+    # Stand vor der Umstellung, 1:1 aus der alten Parser-Schleife übernommen
+    col0 = str(row[0] or "").strip()
+    if col0.startswith("Wochensumme") or col0.startswith("Tag") or col0.startswith("Zeitkonto") or col0.startswith("Kontingent"):
+        return False
+    dm = re.search(r'^(\d{2})\s+(MO|DI|MI|DO|FR|SA|SO)', col0)
+    full_row_text = " ".join([str(c) for c in row if c])
+    found_type = None
+    for k, v in TYPE_MAP.items():
+        if k in full_row_text: found_type = v
+    times = re.findall(r'(\d{2}:\d{2})', full_row_text)
+    if times and all(t == "00:00" for t in times): times = []
+    glz_saldo_val = None
+    if dm:
+        for c in reversed(row):
+            c_str = str(c or "").strip()
+            if re.match(r'^-?\d{1,3}[.,]\d{2}$', c_str):
+                try:
+                    glz_saldo_val = float(c_str.replace(',', '.'))
+                    break
+                except ValueError: pass
+    return (int(dm.group(1)) if dm else None), found_type, times, glz_saldo_val
+
+def random_rows(count, seed=3):
+    rnd = random.Random(seed)
+    words = list(TYPE_MAP) + ["Reisezeit", "Telearb.", "anwesend Mobil", "BUCHUNG FEHLT!", "Pause", "x", "", None]
+    saldos = ["00:00", "0,00", "-1,25", "12,50", "123,45", "1234,56", "3.25", "7,5", " 4,00 "]
+    def cell():
+        r = rnd.random()
+        if r < 0.25: return f"{rnd.randint(0, 23):02d}:{rnd.randint(0, 59):02d}"
+        if r < 0.35: return rnd.choice(saldos)
+        if r < 0.45: return None
+        return rnd.choice(words)
+    rows = []
+    for _ in range(count):
+        day = f"{rnd.randint(1, 31):02d} {rnd.choice(['MO', 'DI', 'MI', 'DO', 'FR', 'SA', 'SO', 'XX'])}"
+        col0 = rnd.choice([day, day, day, "", None, "Wochensumme", "Tag", "Zeitkonto", "Kontingent"])
+        rows.append([col0] + [cell() for _ in range(rnd.randint(1, 9))])
+    return rows
+
+if __name__ == '__main__':
+    rows = random_rows(int(sys.argv[1]) if len(sys.argv) > 1 else 3000)
+    for row in rows:
+        assert legacy_classify_row(row) == classify_row(row), row
+
+    for label, fn in (("alt", legacy_classify_row), ("neu", classify_row)):
+        best = min(timeit.repeat(lambda: [fn(r) for r in rows], number=20, repeat=5))
+        print(f"{label}: {best * 1000 / 20:.2f} ms pro {len(rows)} Zeilen")
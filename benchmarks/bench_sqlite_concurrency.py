@@ -0,0 +1,73 @@
+"""
+Benchmark: Lesezugriffe während einer langen Schreib-Transaktion (wie bei PDF-Import oder Serienplanung).
+Ein Schreiber fügt in einer Transaktion viele Einträge ein und hält sie kurz offen, ein Leser fragt
+parallel Monatsdaten ab. Verglichen wird der klassische Rollback-Journal-Modus mit der WAL-Konfiguration.
+
+Aufruf: python benchmarks/bench_sqlite_concurrency.py [zeilen]
+"""
+import os
+import sys
+import time
+import sqlite3
+import tempfile
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from storage import sqlite_settings, apply_sqlite_pragmas
+
+HOLD_SECONDS = 1.5
+
+def setup_db(path, pragmas):
+    conn = sqlite3.connect(path)
+    apply_sqlite_pragmas(conn, pragmas)
+    conn.execute("CREATE TABLE work_entry (id INTEGER PRIMARY KEY, date TEXT, type TEXT, start_time TEXT, end_time TEXT, net_minutes INTEGER)")
+    conn.execute("CREATE INDEX ix_date ON work_entry (date)")
+    conn.executemany("INSERT INTO work_entry (date, type, start_time, end_time, net_minutes) VALUES (?, 'home', '08:00', '16:30', 480)",
+                     [(f"2024-{m:02d}-{d:02d}",) for m in range(1, 13) for d in range(1, 29)])
+    conn.commit()
+    conn.close()
+
+def writer(path, pragmas, rows, started, done):
+    conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+    apply_sqlite_pragmas(conn, pragmas)
+    conn.execute("BEGIN IMMEDIATE")
+    started.set()
+    conn.executemany("INSERT INTO work_entry (date, type, start_time, end_time, net_minutes) VALUES (?, 'office', '07:00', '15:30', 480)",
+                     [(f"2025-{(i % 12) + 1:02d}-{(i % 28) + 1:02d}",) for i in range(rows)])
+    time.sleep(HOLD_SECONDS)
+    conn.execute("COMMIT")
+    conn.close()
+    done.set()
+
+def reader(path, pragmas, started, done, latencies, errors):
+    conn = sqlite3.connect(path, timeout=5)
+    apply_sqlite_pragmas(conn, pragmas)
+    started.wait()
+    while not done.is_set():
+        t0 = time.perf_counter()
+        try:
+            conn.execute("SELECT date, type, SUM(net_minutes) FROM work_entry WHERE date LIKE '2024-03%' GROUP BY date, type").fetchall()
+            latencies.append(time.perf_counter() - t0)
+        except sqlite3.OperationalError:
+            errors.append(time.perf_counter() - t0)
+    conn.close()
+
+def run(label, pragmas, rows):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bench.db')
+        setup_db(path, pragmas)
+        started, done, latencies, errors = threading.Event(), threading.Event(), [], []
+        threads = [threading.Thread(target=writer, args=(path, pragmas, rows, started, done)),
+                   threading.Thread(target=reader, args=(path, pragmas, started, done, latencies, errors))]
+        t0 = time.perf_counter()
+        for t in threads: t.start()
+        for t in threads: t.join()
+        total = time.perf_counter() - t0
+        worst = max(latencies + errors, default=0)
+        print(f"{label:>10}: {len(latencies):6d} Lesezugriffe in {total:.1f}s, {len(errors)} Fehler, "
+              f"längste Wartezeit {worst * 1000:.0f} ms")
+
+if __name__ == '__main__':
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 300_000
+    run("DELETE", {"journal_mode": "DELETE", "synchronous": "FULL", "cache_size": -2000}, rows)
+    run("WAL", sqlite_settings(), rows)
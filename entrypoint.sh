@@ -16,4 +16,5 @@ fi
 # exec ist wichtig: Es ersetzt den Shell-Prozess durch Gunicorn.
 # Damit empfängt Gunicorn Signale (wie 'Stop') direkt.
 echo "Starte Gunicorn Server..."
-exec gunicorn -w 2 -b 0.0.0.0:5000 app:app
\ No newline at end of file
+# gthread: offene SSE-Streams (/api/events) belegen nur einen Thread, nicht den ganzen Worker
+exec gunicorn -w 2 --worker-class gthread --threads "${GUNICORN_THREADS:-8}" -b 0.0.0.0:5000 app:app
\ No newline at end of file
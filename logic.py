@@ -1,9 +1,13 @@
-from datetime import datetime, timedelta
+from datetime import date
+from functools import lru_cache
+from types import MappingProxyType
+from collections import namedtuple
+from array import array
+import calendar
+import holidays
 
-def normalize_time_str(t_str):
-    """
-    Bereinigt Benutzereingaben und macht daraus ein sauberes 'HH:MM' Format.
-    """
+def _split_time(t_str):
+    """Zerlegt Benutzereingaben ('8', '800', '08.00', ' 8:00 ') in (Stunde, Minute) oder None."""
     if not t_str: return None
     t_str = str(t_str).strip().replace('.', ':')
     
@@ -22,67 +26,92 @@ def normalize_time_str(t_str):
             return None
         
         if h > 23 or m > 59: return None
-        return f"{h:02d}:{m:02d}"
+        return h, m
     except ValueError:
         return None
 
+def normalize_time_str(t_str):
+    """
+    Bereinigt Benutzereingaben und macht daraus ein sauberes 'HH:MM' Format.
+    """
+    hm = _split_time(t_str)
+    return f"{hm[0]:02d}:{hm[1]:02d}" if hm else None
+
+def parse_time_minutes(t_str):
+    """Uhrzeit (Benutzereingabe oder 'HH:MM') -> Minute des Tages (0..1439) oder None."""
+    hm = _split_time(t_str)
+    if not hm or hm[0] < 0 or hm[1] < 0: return None
+    return hm[0] * 60 + hm[1]
+
+# --- MINUTEN-KERNEL (ArbZG-Pausen) ---
+MINUTES_PER_DAY = 1440
+
+def net_minutes_for_presence(presence):
+    """
+    Pausenkappung nach ArbZG auf ganzen Minuten Präsenz:
+    bis 6:00 kein Abzug, 6:00-6:30 gedeckelt auf 6:00, bis 9:30 -30 Min,
+    9:30-9:45 gedeckelt auf 9:00, darüber -45 Min.
+    """
+    if presence <= 360: return presence
+    if presence <= 390: return 360
+    if presence <= 570: return presence - 30
+    if presence <= 585: return 540
+    return presence - 45
+
+# Präsenzdauer ist immer < 24h -> eine Nachschlagetabelle ersetzt die Fallunterscheidung
+NET_MINUTES_BY_PRESENCE = array('H', map(net_minutes_for_presence, range(MINUTES_PER_DAY)))
+
+def net_minutes_between(start_minute, end_minute):
+    """Netto-Minuten zwischen zwei Minuten des Tages (Ende < Start = über Mitternacht)."""
+    if start_minute is None or end_minute is None: return 0
+    return NET_MINUTES_BY_PRESENCE[(end_minute - start_minute) % MINUTES_PER_DAY]
+
+def net_minutes_batch(start_minutes, end_minutes):
+    """
+    Netto-Minuten für viele Einträge auf einmal. Erwartet gleich lange Sequenzen von Minuten des Tages,
+    fehlende Zeiten als negativer Wert (oder None) -> 0.
+    """
+    table = NET_MINUTES_BY_PRESENCE
+    return array('H', [table[(e - s) % MINUTES_PER_DAY] if s is not None and e is not None and s >= 0 and e >= 0 else 0
+                       for s, e in zip(start_minutes, end_minutes)])
+
+def calculate_net_minutes(start_str, end_str):
+    """
+    Netto-Arbeitszeit in ganzen Minuten (für die Spalte WorkEntry.net_minutes).
+    """
+    return net_minutes_between(parse_time_minutes(start_str), parse_time_minutes(end_str))
+
 def calculate_net_hours(start_str, end_str):
     """
-    Berechnet die Netto-Arbeitszeit. 
+    Berechnet die Netto-Arbeitszeit in Stunden (2 Nachkommastellen).
     WICHTIG: Zieht Pausen gemäß Arbeitszeitgesetz ab inkl. dynamischer Kappungsgrenzen.
     """
-    start_str = normalize_time_str(start_str)
-    end_str = normalize_time_str(end_str)
-    
-    if not start_str or not end_str:
-        return 0.0
+    return round(calculate_net_minutes(start_str, end_str) / 60, 2)
 
-    try:
-        fmt = "%H:%M"
-        t_start = datetime.strptime(start_str, fmt)
-        t_end = datetime.strptime(end_str, fmt)
-        
-        if t_end < t_start:
-            # Fall für Nachtschicht (falls relevant), sonst passiert hier nichts Schlimmes
-            t_end += timedelta(days=1)
-            
-        diff = t_end - t_start
-        # Wichtig: total_seconds gibt float zurück
-        hours_worked = diff.total_seconds() / 3600.0
-        
-        # Pausenkappung nach ArbZG:
-        if hours_worked <= 6.0:
-            net_hours = hours_worked
-        elif hours_worked <= 6.5:
-            # Präsenz zwischen 6.0h und 6.5h -> Netto wird auf 6.0h gedeckelt (füllt die 30 Min. Pause)
-            net_hours = 6.0
-        elif hours_worked <= 9.5:
-            # Präsenz bis 9.5h -> 30 Min Pause abziehen (ergibt max. 9.0h Netto)
-            net_hours = hours_worked - 0.5
-        elif hours_worked <= 9.75:
-            # Präsenz zwischen 9.5h und 9.75h -> Netto wird auf 9.0h gedeckelt (füllt die restlichen 15 Min.)
-            net_hours = 9.0
-        else:
-            # Präsenz über 9.75h -> Volle 45 Min Pause abziehen
-            net_hours = hours_worked - 0.75
-            
-        return max(0.0, round(net_hours, 2))
-    except Exception as e:
-        print(f"Fehler bei Zeitberechnung: {e}") # Logging hilft im Docker Container
-        return 0.0
+def gross_minutes_needed(target_net_minutes):
+    """Nötige Brutto-Anwesenheit in Minuten für ein Netto-Ziel (Umkehrung der Pausenregel)."""
+    if target_net_minutes <= 360: return target_net_minutes
+    # Bis zu einem Ziel von 9:00 Netto reicht eine Pause von 30 Min.
+    if target_net_minutes <= 540: return target_net_minutes + 30
+    # Alles darüber durchbricht zwingend die 9:30-Brutto-Marke -> 45 Min. Pause
+    return target_net_minutes + 45
 
 def calculate_gross_time_needed(target_net_hours):
     """
-    Berechnet nötige Brutto-Anwesenheit für ein Netto-Ziel.
+    Berechnet nötige Brutto-Anwesenheit für ein Netto-Ziel (Stunden-API über gross_minutes_needed).
     """
-    if target_net_hours <= 6.0:
-        return target_net_hours
-    elif target_net_hours <= 9.0: 
-        # Bis zu einem Ziel von 9,0h Netto reicht eine Pause von 0,5h aus
-        return target_net_hours + 0.5
-    else:
-        # Alles über 9,0h Netto durchbricht zwingend die 9,5h Brutto-Marke -> 0,75h Pause nötig
-        return target_net_hours + 0.75
+    return gross_minutes_needed(round(target_net_hours * 60)) / 60
+
+@lru_cache(maxsize=16)
+def get_holiday_calendar(year):
+    """
+    Liefert die hessischen Feiertage eines Jahres inkl. Heiligabend/Silvester als
+    unveränderliches Mapping (date -> Name). Wird prozessweit pro Jahr gecacht.
+    """
+    he_holidays = holidays.DE(subdiv='HE', years=year)
+    he_holidays[date(year, 12, 24)] = "Heiligabend"
+    he_holidays[date(year, 12, 31)] = "Silvester"
+    return MappingProxyType(dict(he_holidays))
 
 def get_day_info(date_obj, settings, he_holidays, custom_map):
     """
@@ -130,4 +159,121 @@ def get_day_info(date_obj, settings, he_holidays, custom_map):
         "holiday_name": "",
         "is_short_day": False,
         "is_off_day": False
-    }
\ No newline at end of file
+    }
+
+def calculate_glz_delta(is_workday, target, day_types, day_net):
+    """
+    Berechnet die GLZ-Veränderung eines Tages aus Soll-Infos, Buchungstypen und Netto-Zeit.
+    """
+    if not is_workday:
+        return day_net
+    if any(t in ('sick', 'vacation') for t in day_types):
+        return day_net
+    if any(t == 'glz' for t in day_types):
+        return day_net - target
+    # Wenn der Tag "Leer" ist, belasten wir das GLZ nicht
+    if all(not t for t in day_types):
+        return 0.0
+    return day_net - target
+
+
+# --- KOMPILIERTER JAHRESKALENDER ---
+FLAG_WORKDAY = 1
+FLAG_SHORT_DAY = 2
+FLAG_OFF_DAY = 4
+
+CalendarSettings = namedtuple('CalendarSettings', ['weekly_hours', 'active_weekdays'])
+CalendarHoliday = namedtuple('CalendarHoliday', ['name', 'hours'])
+
+class YearCalendar:
+    """
+    Vorberechnete Tagesinfos eines Jahres als kompakte Arrays, indiziert über den Tag im Jahr (0-basiert).
+    """
+    __slots__ = ('year', 'first_ordinal', 'targets', 'flags', 'holiday_names', 'months')
+
+    def __init__(self, year, settings, custom_map):
+        he_holidays = get_holiday_calendar(year)
+        num_days = 366 if calendar.isleap(year) else 365
+        self.year = year
+        self.first_ordinal = date(year, 1, 1).toordinal()
+        self.targets = array('d', [0.0]) * num_days
+        self.flags = bytearray(num_days)
+        self.holiday_names = [""] * num_days
+        self.months = bytearray(num_days)
+
+        for i in range(num_days):
+            date_obj = date.fromordinal(self.first_ordinal + i)
+            info = get_day_info(date_obj, settings, he_holidays, custom_map)
+            self.months[i] = date_obj.month
+            self.targets[i] = info["target"]
+            self.flags[i] = ((FLAG_WORKDAY if info["is_workday"] else 0)
+                             | (FLAG_SHORT_DAY if info["is_short_day"] else 0)
+                             | (FLAG_OFF_DAY if info["is_off_day"] else 0))
+            if info["holiday_name"]: self.holiday_names[i] = info["holiday_name"]
+
+    def index(self, date_obj):
+        return date_obj.toordinal() - self.first_ordinal
+
+    def is_workday(self, i):
+        return bool(self.flags[i] & FLAG_WORKDAY)
+
+def get_year_calendar(year, settings, custom_map):
+    """
+    Liefert den kompilierten Kalender eines Jahres. Der Cache-Schlüssel enthält die
+    relevanten Einstellungen und die eigenen Feiertage des Jahres, Änderungen daran
+    führen also automatisch zu einem neuen Kalender.
+    """
+    settings_key = CalendarSettings(settings.weekly_hours, settings.active_weekdays)
+    custom_key = tuple(sorted((d, c.name, c.hours) for d, c in custom_map.items() if d.year == year))
+    return _compile_year_calendar(year, settings_key, custom_key)
+
+@lru_cache(maxsize=32)
+def _compile_year_calendar(year, settings_key, custom_key):
+    custom_map = {d: CalendarHoliday(name, hours) for d, name, hours in custom_key}
+    return YearCalendar(year, settings_key, custom_map)
+
+
+# --- JAHRES-AGGREGATION ---
+CODE_HOME, CODE_PLANNED, CODE_OFFICE, CODE_DR, CODE_VACATION = 1, 2, 3, 4, 5
+TYPE_CODES = {'home': CODE_HOME, 'planned': CODE_PLANNED, 'office': CODE_OFFICE, 'dr': CODE_DR, 'vacation': CODE_VACATION}
+_MARK_HO, _MARK_OFFICE, _MARK_VACATION = 1, 2, 4
+
+def aggregate_year(cal, day_idx, type_codes, net_hours, ho_quota_percent):
+    """
+    Berechnet die Monatsstatistik eines Jahres in einem Durchlauf über spaltenweise Eintragsdaten.
+    day_idx/type_codes/net_hours sind gleich lange Sequenzen (Tag im Jahr, TYPE_CODES-Wert, Netto-Stunden).
+    Für geplante Einträge enthält net_hours bereits das Tagessoll.
+    """
+    ho_h = [0.0] * 13
+    off_h = [0.0] * 13
+    day_marks = bytearray(len(cal.flags))
+
+    for i, code, net in zip(day_idx, type_codes, net_hours):
+        m = cal.months[i]
+        if code == CODE_HOME or code == CODE_PLANNED:
+            ho_h[m] += net
+            day_marks[i] |= _MARK_HO
+        elif code == CODE_OFFICE or code == CODE_DR:
+            off_h[m] += net
+            day_marks[i] |= _MARK_OFFICE
+        elif code == CODE_VACATION and cal.flags[i] & FLAG_WORKDAY:
+            day_marks[i] |= _MARK_VACATION
+
+    workdays, targets = [0] * 13, [0.0] * 13
+    days_ho, days_off, days_vac = [0] * 13, [0] * 13, [0] * 13
+    for i, m in enumerate(cal.months):
+        if cal.flags[i] & FLAG_WORKDAY:
+            workdays[m] += 1
+            targets[m] += cal.targets[i]
+        marks = day_marks[i]
+        if marks:
+            if marks & _MARK_HO: days_ho[m] += 1
+            if marks & _MARK_OFFICE: days_off[m] += 1
+            if marks & _MARK_VACATION: days_vac[m] += 1
+
+    return [{
+        "month": m, "workdays": workdays[m], "days_ho": days_ho[m], "days_office": days_off[m],
+        "days_vacation": days_vac[m], "ho_hours_made": round(ho_h[m], 2),
+        "ho_hours_allowed": round(targets[m] * (ho_quota_percent/100), 2),
+        "office_hours_made": round(off_h[m], 2)
+    } for m in range(1, 13)]
@@ -1,5 +1,6 @@
 import sqlite3
 import os
+from logic import parse_time_minutes, net_minutes_batch
 
 # Robust: Dynamische Pfadermittlung (exakt wie in app.py)
 basedir = os.path.abspath(os.path.dirname(__file__))
@@ -35,12 +36,38 @@ def migrate():
         cursor.execute("PRAGMA table_info(work_entry)")
         columns = [row[1] for row in cursor.fetchall()]
         
+        migrated = False
         if "glz_override" not in columns:
             print("[Migrate] Spalte 'glz_override' fehlt. Starte Migration 2...")
             cursor.execute("ALTER TABLE work_entry ADD COLUMN glz_override FLOAT")
             conn.commit()
+            migrated = True
             print("[Migrate] Migration 2 erfolgreich abgeschlossen! GLZ-Override Spalte hinzugefügt.")
-        else:
+
+        # 3. PRÜFUNG: Fehlt die Spalte 'net_minutes'? (Netto-Zeit für SQL-Aggregation)
+        if "net_minutes" not in columns:
+            print("[Migrate] Spalte 'net_minutes' fehlt. Starte Migration 3...")
+            cursor.execute("ALTER TABLE work_entry ADD COLUMN net_minutes INTEGER")
+            conn.commit()
+            migrated = True
+            print("[Migrate] Migration 3 erfolgreich abgeschlossen! Netto-Minuten Spalte hinzugefügt.")
+
+        # 4. PRÜFUNG: Fehlt der zusammengesetzte Index (date, type)? Ersetzt den alten Einzel-Index auf 'date'.
+        cursor.execute("PRAGMA index_list(work_entry)")
+        indexes = [row[1] for row in cursor.fetchall()]
+        if "ix_work_entry_date_type" not in indexes:
+            print("[Migrate] Index (date, type) fehlt. Starte Migration 4...")
+            migrate_date_type_index(conn, cursor)
+            migrated = True
+            print("[Migrate] Migration 4 erfolgreich abgeschlossen! Index (date, type) angelegt.")
+
+        # Fehlende Netto-Minuten immer nachtragen (z.B. von älteren App-Versionen geschriebene Zeilen)
+        filled = backfill_net_minutes(conn, cursor)
+        if filled:
+            migrated = True
+            print(f"[Migrate] Netto-Minuten für {filled} Einträge berechnet.")
+
+        if not migrated:
             print("[Migrate] Datenbank-Schema für 'work_entry' ist auf dem neuesten Stand.")
             
     except Exception as e:
@@ -48,6 +75,23 @@ def migrate():
     finally:
         conn.close()
 
+def backfill_net_minutes(conn, cursor):
+    cursor.execute("SELECT id, start_time, end_time FROM work_entry WHERE net_minutes IS NULL")
+    rows = cursor.fetchall()
+    net = net_minutes_batch([parse_time_minutes(start) for _, start, _ in rows], [parse_time_minutes(end) for _, _, end in rows])
+    updates = [(minutes, entry_id) for minutes, (entry_id, _, _) in zip(net, rows)]
+    if updates:
+        cursor.executemany("UPDATE work_entry SET net_minutes = ? WHERE id = ?", updates)
+        conn.commit()
+    return len(updates)
+
+def migrate_date_type_index(conn, cursor):
+    cursor.execute("CREATE INDEX IF NOT EXISTS ix_work_entry_date_type ON work_entry (date, type)")
+    # Der Einzel-Index ist ein Präfix des neuen Index und damit überflüssig
+    cursor.execute("DROP INDEX IF EXISTS ix_work_entry_date")
+    cursor.execute("ANALYZE work_entry")
+    conn.commit()
+
 def perform_unique_constraint_migration(conn, cursor):
     try:
         cursor.execute("ALTER TABLE work_entry RENAME TO work_entry_old")
@@ -1,4 +1,7 @@
 from flask_sqlalchemy import SQLAlchemy
+from datetime import datetime
+from sqlalchemy import event
+from logic import calculate_net_minutes
 
 db = SQLAlchemy()
 
@@ -28,8 +31,11 @@ class WorkEntry(db.Model):
     """
     Die tatsächlichen Zeiteinträge.
     """
+    # Zeitraum-Abfragen (halboffen auf date) und Filter auf (date, type) laufen über diesen Index
+    __table_args__ = (db.Index('ix_work_entry_date_type', 'date', 'type'),)
+
     id = db.Column(db.Integer, primary_key=True)
-    date = db.Column(db.String(10), nullable=False, index=True) # Format: YYYY-MM-DD
+    date = db.Column(db.String(10), nullable=False) # Format: YYYY-MM-DD (ISO, sortiert chronologisch)
     # 'home', 'office', 'planned', 'sick', 'vacation', 'dr', 'glz'
     type = db.Column(db.String(20), default="home") 
     start_time = db.Column(db.String(5), nullable=True) # Format: HH:MM
@@ -37,4 +43,61 @@ class WorkEntry(db.Model):
     comment = db.Column(db.String(255), nullable=True)
     
     # Optionales Überschreiben des GLZ-Saldos an diesem Tag
-    glz_override = db.Column(db.Float, nullable=True)
\ No newline at end of file
+    glz_override = db.Column(db.Float, nullable=True)
+
+    # Netto-Arbeitszeit aus Start/Ende in Minuten (wird beim Schreiben automatisch gepflegt)
+    net_minutes = db.Column(db.Integer, nullable=True)
+
+@event.listens_for(WorkEntry, 'before_insert')
+@event.listens_for(WorkEntry, 'before_update')
+def sync_net_minutes(mapper, connection, target):
+    """Hält net_minutes bei jedem ORM-Schreibvorgang synchron zu Start/Ende."""
+    target.net_minutes = calculate_net_minutes(target.start_time, target.end_time)
+
+class GlzCheckpoint(db.Model):
+    """
+    Materialisierter GLZ-Saldo am Monatsende (= Übertrag in den Folgemonat).
+    Wird ab dem frühesten geänderten Datum verworfen und beim nächsten Abruf neu berechnet.
+    """
+    month = db.Column(db.String(7), primary_key=True) # Format: YYYY-MM
+    balance = db.Column(db.Float, nullable=False)
+
+class ImportJob(db.Model):
+    """
+    Hintergrund-Importe (PDF/ZIP) inkl. Fortschritt, damit das Frontend den Status abfragen kann.
+    """
+    id = db.Column(db.String(32), primary_key=True) # UUID (hex)
+    # 'queued', 'running', 'done', 'failed'
+    status = db.Column(db.String(10), nullable=False, default="queued")
+    pages_done = db.Column(db.Integer, nullable=False, default=0)
+    pages_total = db.Column(db.Integer, nullable=False, default=0)
+    result = db.Column(db.Text, nullable=True) # JSON-Zusammenfassung nach Abschluss
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.now)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.now, onupdate=datetime.now)
+
+class AppState(db.Model):
+    """
+    Kleine Schlüssel/Wert-Tabelle für prozessübergreifende Zustände (z.B. Wasserstände von Hintergrund-Aufgaben).
+    """
+    key = db.Column(db.String(50), primary_key=True)
+    value = db.Column(db.String(255), nullable=True)
+
+class DataRevision(db.Model):
+    """
+    Änderungszähler je Startmonat: eine Änderung ab Monat M betrifft M und alle späteren Monate (GLZ-Übertrag).
+    Version eines Monats = höchste seq aller Zeilen mit from_month <= Monat.
+    """
+    from_month = db.Column(db.String(7), primary_key=True) # Format: YYYY-MM ('0000-00' = alles)
+    seq = db.Column(db.Integer, nullable=False)
+
+class ChangeLog(db.Model):
+    """
+    Append-only Änderungsprotokoll für den Delta-Abgleich der Clients (/api/changes?since=<seq>).
+    Eine Zeile je geschriebener Zeile; date = betroffener Tag (None = betrifft alles, z.B. Settings).
+    """
+    __table_args__ = {'sqlite_autoincrement': True} # seq wird nie wiederverwendet, auch nach dem Aufräumen
+    seq = db.Column(db.Integer, primary_key=True)
+    table_name = db.Column(db.String(30), nullable=False)
+    row_id = db.Column(db.Integer, nullable=True)
+    op = db.Column(db.String(10), nullable=False) # insert | update | delete
+    date = db.Column(db.String(10), nullable=True) # Format: YYYY-MM-DD
@@ -0,0 +1,210 @@
+import io
+import os
+import re
+import json
+import hashlib
+import tempfile
+from datetime import date
+import pdfplumber
+
+# Bei jeder Änderung am Parser-Ergebnis erhöhen, damit alte Cache-Einträge ungültig werden
+PARSER_VERSION = 1
+
+# --- ZEILEN-KLASSIFIKATION ---
+# Reihenfolge = Priorität: bei mehreren Treffern in einer Zeile gewinnt der spätere Schlüssel
+TYPE_MAP = {
+    "Mobil": "home", "Telearb": "home", "anwesend": "office", 
+    "Krank": "sick", "Urlaub": "vacation", "Erholungs": "vacation", "Zusatz": "vacation", "Sonder": "vacation",
+    "Gleitzeit": "glz", "GLZ": "glz",
+    "Dienstreise": "dr", "Fortbildung": "dr", "Reise": "dr",
+    "BUCHUNG FEHLT": "missing"
+}
+# Rückwärts durchsucht reicht der erste Treffer (gleiche Präzedenz wie "letzter Treffer gewinnt")
+_TYPE_KEYWORDS = tuple(reversed(TYPE_MAP.items()))
+_RESET_PREFIXES = ("Wochensumme", "Tag", "Zeitkonto", "Kontingent")
+_DAY_RE = re.compile(r'(\d{2})\s+(?:MO|DI|MI|DO|FR|SA|SO)')
+_TIME_RE = re.compile(r'\d{2}:\d{2}')
+_SALDO_RE = re.compile(r'-?\d{1,3}[.,]\d{2}')
+
+def classify_row(row):
+    """
+    Zerlegt eine Tabellenzeile in einem Durchlauf: (Tag oder None, Typ, Zeiten, GLZ-Saldo).
+    Summen-/Kopfzeilen liefern False (beenden den aktuellen Tag).
+    """
+    col0 = str(row[0] or "").strip()
+    if col0.startswith(_RESET_PREFIXES): return False
+
+    dm = _DAY_RE.match(col0)
+    full_row_text = " ".join([str(c) for c in row if c])
+
+    found_type = None
+    for k, v in _TYPE_KEYWORDS:
+        if k in full_row_text:
+            found_type = v
+            break
+
+    times = _TIME_RE.findall(full_row_text)
+    if times and times.count("00:00") == len(times): times = []
+
+    glz_saldo_val = None
+    if dm:
+        for c in reversed(row):
+            if not c: continue
+            c_str = str(c).strip()
+            if _SALDO_RE.fullmatch(c_str):
+                glz_saldo_val = float(c_str.replace(',', '.'))
+                break
+
+    return (int(dm.group(1)) if dm else None), found_type, times, glz_saldo_val
+
+def parse_pdf_content(file_obj, on_page=None):
+    extracted_entries = []
+    
+    with pdfplumber.open(file_obj) as pdf:
+        first_page_text = pdf.pages[0].extract_text()
+        match_my = re.search(r'Monat:?\s*([a-zA-ZäöüÄÖÜ]+)\s*[-_]?\s*(\d{4})', first_page_text)
+        if not match_my: raise ValueError("Monat/Jahr im PDF nicht erkannt")
+            
+        m_dict = {'Januar':1,'Februar':2,'März':3,'April':4,'Mai':5,'Juni':6,'Juli':7,'August':8,'September':9,'Oktober':10,'November':11,'Dezember':12}
+        month = m_dict.get(match_my.group(1))
+        year = int(match_my.group(2))
+        
+        daily_data = {}
+        curr_day = None
+
+        for page in pdf.pages:
+            tables = page.extract_tables()
+            for table in tables:
+                for row in table:
+                    if not row or len(row) < 2: continue
+                    parsed = classify_row(row)
+                    if parsed is False:
+                        curr_day = None
+                        continue
+
+                    day, found_type, times, glz_saldo_val = parsed
+                    if day is not None: 
+                        curr_day = day
+                    elif curr_day is None: 
+                        continue
+
+                    if curr_day not in daily_data: daily_data[curr_day] = []
+
+                    entry = {'type': None, 'times': [], 'glz_override': glz_saldo_val}
+                    is_valid = False
+                    
+                    if found_type == "missing":
+                        entry['type'] = ''
+                        entry['comment'] = "Buchung fehlt (PDF)"
+                        is_valid = True
+                    elif times and len(times) >= 2:
+                        entry['type'] = found_type if found_type else "office"
+                        entry['times'] = times
+                        is_valid = True
+                    elif found_type in ["vacation", "sick", "glz"]:
+                        entry['type'] = found_type
+                        is_valid = True
+                    
+                    if glz_saldo_val is not None:
+                        is_valid = True
+                    
+                    if is_valid:
+                        if not entry['times']:
+                            already_exists = False
+                            for existing in daily_data[curr_day]:
+                                if existing['type'] == entry['type'] and not existing['times']:
+                                    already_exists = True
+                                    if entry['glz_override'] is not None:
+                                        existing['glz_override'] = entry['glz_override']
+                                    break
+                            if already_exists:
+                                continue
+                        
+                        daily_data[curr_day].append(entry)
+            
+            if on_page: on_page()
+
+        for d, blocks in daily_data.items():
+            try:
+                date_obj = date(year, month, d)
+                for b in blocks:
+                    extracted_entries.append({
+                        'date': date_obj,
+                        'type': b['type'] or '',
+                        'start': b['times'][0] if b['times'] else '',
+                        'end': b['times'][1] if b['times'] and len(b['times']) > 1 else '',
+                        'comment': b.get('comment', ''),
+                        'glz_override': b.get('glz_override')
+                    })
+            except ValueError: continue
+                
+    return extracted_entries
+
+def parse_pdf_bytes(data, on_page=None):
+    """
+    Parst ein PDF aus Rohdaten. Top-Level-Funktion, damit sie in einem Prozess-Pool laufen kann.
+    """
+    return parse_pdf_content(io.BytesIO(data), on_page)
+
+def count_pdf_pages(data):
+    """Seitenanzahl eines PDFs (für die Fortschrittsanzeige von Import-Jobs)."""
+    with pdfplumber.open(io.BytesIO(data)) as pdf:
+        return len(pdf.pages)
+
+
+class ParseCache:
+    """
+    Festplatten-Cache für Parser-Ergebnisse, adressiert über SHA-256 der PDF-Bytes plus Parser-Version.
+    Die Größe ist begrenzt, verdrängt wird der am längsten nicht genutzte Eintrag (mtime).
+    """
+
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, data):
+        digest = hashlib.sha256(data).hexdigest()
+        return os.path.join(self.directory, f"v{PARSER_VERSION}-{digest}.json")
+
+    def get(self, data):
+        path = self._path(data)
+        try:
+            with open(path, encoding='utf-8') as f:
+                entries = json.load(f)
+            os.utime(path) # Zugriff merken (LRU)
+        except (OSError, ValueError):
+            return None
+        for e in entries:
+            e['date'] = date.fromisoformat(e['date'])
+        return entries
+
+    def put(self, data, entries):
+        serializable = [{**e, 'date': e['date'].isoformat()} for e in entries]
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(serializable, f)
+            os.replace(tmp_path, self._path(data))
+        except OSError:
+            if os.path.exists(tmp_path): os.remove(tmp_path)
+            return
+        self._evict()
+
+    def _evict(self):
+        files = []
+        for name in os.listdir(self.directory):
+            if not name.endswith('.json'): continue
+            try:
+                st = os.stat(os.path.join(self.directory, name))
+                files.append((st.st_mtime, st.st_size, name))
+            except OSError:
+                continue
+        total = sum(size for _, size, _ in files)
+        for _, size, name in sorted(files):
+            if total <= self.max_bytes: break
+            try:
+                os.remove(os.path.join(self.directory, name))
+                total -= size
+            except OSError:
+                pass
@@ -0,0 +1,50 @@
+import os
+from sqlalchemy import event
+
+# --- SQLITE-KONFIGURATION ---
+# Alle Werte per Umgebungsvariable überschreibbar (z.B. SQLITE_JOURNAL_MODE=DELETE auf Netzlaufwerken,
+# da WAL Shared Memory auf dem lokalen Dateisystem braucht).
+def sqlite_settings():
+    return {
+        "journal_mode": os.environ.get('SQLITE_JOURNAL_MODE', 'WAL'),
+        "synchronous": os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL'),
+        "busy_timeout": int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 10000)),
+        "mmap_size": int(os.environ.get('SQLITE_MMAP_SIZE', 64 * 1024 * 1024)),
+        # Negativ = Angabe in KiB statt in Seiten
+        "cache_size": -int(os.environ.get('SQLITE_CACHE_SIZE_KB', 16 * 1024)),
+        "foreign_keys": 'ON',
+        "temp_store": 'MEMORY',
+    }
+
+def engine_options():
+    """
+    Pool-Einstellungen für Flask-SQLAlchemy. SQLite kennt keinen Server -> wenige, dauerhaft offene
+    Verbindungen pro Worker genügen; der Timeout des Treibers entspricht dem busy_timeout.
+    """
+    busy_timeout = sqlite_settings()["busy_timeout"]
+    return {
+        "pool_size": int(os.environ.get('SQLITE_POOL_SIZE', 5)),
+        "max_overflow": int(os.environ.get('SQLITE_POOL_OVERFLOW', 5)),
+        "pool_timeout": busy_timeout / 1000,
+        "connect_args": {"timeout": busy_timeout / 1000, "check_same_thread": False},
+    }
+
+def apply_sqlite_pragmas(dbapi_connection, settings=None):
+    """Setzt die Pragmas auf einer rohen sqlite3-Verbindung (journal_mode zuerst, da er synchronous beeinflusst)."""
+    settings = settings or sqlite_settings()
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in settings.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+    finally:
+        cursor.close()
+
+def configure_sqlite_engine(engine):
+    """Registriert die Pragmas für jede neue Verbindung des Engines (auch nach Pool-Recycling)."""
+    settings = sqlite_settings()
+
+    @event.listens_for(engine, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        apply_sqlite_pragmas(dbapi_connection, settings)
+
+    return engine
@@ -0,0 +1,39 @@
+"""
+Erzeugt minimale Zeitnachweis-PDFs (Titelzeile + linierte Tabelle) für Tests ohne private Dateien.
+"""
+
+
+def _escape(text):
+    return text.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+
+def make_pdf(title, rows=(), col_width=90, row_height=16):
+    ops = [f"BT /F1 10 Tf 40 800 Td ({_escape(title)}) Tj ET"]
+    top = 760
+    num_cols = max((len(r) for r in rows), default=0)
+    for r_idx, row in enumerate(rows):
+        y = top - r_idx * row_height
+        for c_idx in range(num_cols):
+            x = 20 + c_idx * col_width
+            # Zellrahmen, damit pdfplumber die Tabelle über die Linien erkennt
+            ops.append(f"{x} {y - row_height} {col_width} {row_height} re S")
+            cell = row[c_idx] if c_idx < len(row) else ""
+            if cell: ops.append(f"BT /F1 7 Tf {x + 2} {y - row_height + 5} Td ({_escape(cell)}) Tj ET")
+    content = "\n".join(ops).encode('latin-1')
+
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 842 842] /Contents 4 0 R /Resources << /Font << /F1 5 0 R >> >> >>",
+        b"<< /Length %d >>\nstream\n" % len(content) + content + b"\nendstream",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+    ]
+    out, offsets = b"%PDF-1.4\n", []
+    for num, obj in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % num + obj + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % o for o in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return out
@@ -1,6 +1,11 @@
 import pytest
-from app import app, db, Settings, WorkEntry, CustomHoliday
+from app import app, db, Settings, WorkEntry, CustomHoliday, GlzCheckpoint, run_planned_conversion, get_app_state, set_app_state, PLANNED_WATERMARK_KEY
+from app import get_config, CONFIG_VERSION_KEY, notifier
+from sqlalchemy import event, func
+from datetime import date
 import json
+import time
+from collections import deque
 
 @pytest.fixture
 def client():
@@ -10,6 +15,16 @@ def client():
     with app.test_client() as client:
         yield client
 
+
+def wait_for_job(client, job_id, timeout=30):
+    """Pollt einen Import-Job, bis er abgeschlossen ist."""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = client.get(f'/api/jobs/{job_id}').get_json()
+        if job["status"] in ("done", "failed"): return job
+        time.sleep(0.1)
+    raise AssertionError(f"Job {job_id} wurde nicht rechtzeitig fertig")
+
 def test_index_page_loads(client):
     response = client.get('/')
     assert response.status_code == 200
@@ -105,4 +120,603 @@ def test_edit_custom_holiday(client):
     updated_holiday = next(h for h in holidays_after_update if h["id"] == holiday_id)
     assert updated_holiday["date"] == "2099-05-02"
     assert updated_holiday["name"] == "Geänderter Feiertag"
-    assert updated_holiday["hours"] == 4.0
\ No newline at end of file
+    assert updated_holiday["hours"] == 4.0
+
+
+def test_glz_checkpoints_invalidated_on_write(client):
+    """Prüft, dass materialisierte Monatsend-Salden nach Änderungen in Vormonaten neu berechnet werden."""
+    settings = client.get('/api/settings').get_json()
+    target = settings['weekly_hours'] / len(settings['active_weekdays'])
+
+    client.post('/api/entry', json={"date": "2031-01-06", "type": "office", "start": "08:00", "end": "18:00", "glz_override": 5.0})
+    client.post('/api/entry', json={"date": "2031-02-03", "type": "home", "start": "08:00", "end": "18:00"})
+
+    res = client.get('/api/month/2031/03')
+    assert res.get_json()['items'][0]['glz_saldo'] == round(5.0 + 9.25 - target, 2)
+    # Der Lesepfad schreibt Checkpoints erst nach dem Ausliefern der Antwort
+    with app.app_context():
+        assert db.session.get(GlzCheckpoint, "2031-02") is None
+    res.close()
+    with app.app_context():
+        assert db.session.get(GlzCheckpoint, "2031-02") is not None
+
+    # Nachträgliche Buchung im Februar muss den März-Übertrag verändern
+    res = client.post('/api/entry', json={"date": "2031-02-04", "type": "office", "start": "08:00", "end": "17:00"})
+    assert res.get_json()["success"] is True
+    with app.app_context():
+        assert db.session.get(GlzCheckpoint, "2031-02") is None
+
+    res = client.get('/api/month/2031/03')
+    assert res.get_json()['items'][0]['glz_saldo'] == round(5.0 + 9.25 - target + 8.5 - target, 2)
+    # Schreibt jemand zwischen Berechnung und Antwort-Ende, werden die vorgemerkten Checkpoints verworfen
+    client.post('/api/entry', json={"date": "2031-02-05", "type": "office", "start": "08:00", "end": "12:00"})
+    res.close()
+    with app.app_context():
+        assert db.session.get(GlzCheckpoint, "2031-02") is None
+
+    # Cleanup
+    with app.app_context():
+        WorkEntry.query.filter(WorkEntry.date.startswith("2031-")).delete(synchronize_session=False)
+        GlzCheckpoint.query.filter(GlzCheckpoint.month >= "2031-01").delete(synchronize_session=False)
+        db.session.commit()
+
+
+def test_net_minutes_stored_and_used_for_year_stats(client):
+    """Prüft, dass die Netto-Minuten beim Speichern gepflegt und in der Jahresstatistik summiert werden."""
+    client.post('/api/entry', json={"date": "2032-03-01", "type": "home", "start": "08:00", "end": "16:15"})
+    client.post('/api/entry', json={"date": "2032-03-02", "type": "office", "start": "07:30", "end": "18:00"})
+
+    with app.app_context():
+        entry = WorkEntry.query.filter_by(date="2032-03-01").first()
+        assert entry.net_minutes == 465  # 8h15 Präsenz - 30 Min Pause
+
+        # Zeitänderung über die API aktualisiert auch die Minuten-Spalte
+        entry_id = entry.id
+    client.post('/api/entry', json={"id": entry_id, "date": "2032-03-01", "type": "home", "start": "08:00", "end": "12:00"})
+    with app.app_context():
+        assert db.session.get(WorkEntry, entry_id).net_minutes == 240
+
+    march = client.get('/api/year/2032').get_json()[2]
+    assert march["ho_hours_made"] == 4.0
+    assert march["office_hours_made"] == 9.75
+    assert march["days_ho"] == 1 and march["days_office"] == 1
+
+    # Cleanup
+    with app.app_context():
+        WorkEntry.query.filter(WorkEntry.date.startswith("2032-")).delete(synchronize_session=False)
+        db.session.commit()
+
+
+def test_impossible_dates_rejected_and_skipped_in_glz_replay(client):
+    """Prüft: unmögliche Kalendertage werden abgelehnt; Altbestand mit solchen Tagen bricht den GLZ-Übertrag nicht."""
+    res = client.post('/api/entry', json={"date": "2051-02-30", "type": "home", "start": "08:00", "end": "16:00"})
+    assert res.status_code == 400
+    with app.app_context():
+        assert WorkEntry.query.filter(WorkEntry.date.startswith("2051-")).count() == 0
+        db.session.add(WorkEntry(date="2051-02-30", type="home", start_time="08:00", end_time="16:00"))
+        db.session.commit()
+
+    assert client.get('/api/month/2051/03').status_code == 200
+    assert client.get('/api/month/2051/12').status_code == 200
+    assert client.get('/api/year/2051').status_code == 200
+
+    with app.app_context():
+        WorkEntry.query.filter(WorkEntry.date.startswith("2051-")).delete(synchronize_session=False)
+        db.session.commit()
+
+
+def test_merge_imported_entries_counts(client):
+    """Prüft den mengenbasierten PDF-Abgleich: Einfügen, Überspringen und Ersetzen."""
+    from datetime import date
+    from app import merge_imported_entries
+
+    def pdf_entry(d, e_type, start='', end='', glz=None):
+        return {'date': d, 'type': e_type, 'start': start, 'end': end, 'comment': '', 'glz_override': glz}
+
+    extracted = [
+        pdf_entry(date(2033, 3, 7), 'office', '08:00', '16:00'),
+        pdf_entry(date(2033, 3, 7), 'home', '16:00', '18:00'),
+        pdf_entry(date(2033, 3, 8), 'vacation'),
+        pdf_entry(date(2033, 3, 12), 'vacation'),  # Sonntag ohne Zeiten -> wird ignoriert
+    ]
+
+    with app.app_context():
+        db.session.add(WorkEntry(date="2033-03-07", type="office", start_time="09:00", end_time="17:00"))
+        db.session.commit()
+
+        counts = merge_imported_entries(extracted, overwrite=False)
+        db.session.commit()
+        assert counts == {"inserted": 2, "skipped": 1, "replaced": 0}
+        assert WorkEntry.query.filter_by(date="2033-03-07").count() == 2
+
+        counts = merge_imported_entries(extracted, overwrite=True)
+        db.session.commit()
+        assert counts == {"inserted": 3, "skipped": 0, "replaced": 3}
+        office = WorkEntry.query.filter_by(date="2033-03-07", type="office").one()
+        assert office.start_time == "08:00" and office.net_minutes == 450
+
+        # Cleanup
+        WorkEntry.query.filter(WorkEntry.date.startswith("2033-")).delete(synchronize_session=False)
+        db.session.commit()
+
+
+def test_batch_import_zip_chronological(client):
+    """Prüft den Batch-Import: ZIP mit mehreren PDFs, chronologische Übernahme und Ergebnis pro Datei."""
+    import io
+    import zipfile
+    from pdf_factory import make_pdf
+
+    header = ["Tag", "Status", "Kommen", "Gehen", "Saldo"]
+    july = make_pdf("Monat: Juli 2034", [header, ["03 MO", "Telearb.", "08:00", "16:30", "2,00"]])
+    june = make_pdf("Monat: Juni 2034", [header, ["05 MO", "anwesend", "07:30", "16:00", "1,50"]])
+
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, 'w') as zf:
+        zf.writestr("2034-07.pdf", july)
+        zf.writestr("2034-06.pdf", june)
+        zf.writestr("readme.txt", "kein PDF")
+    archive.seek(0)
+
+    res = client.post('/api/import/batch', data={
+        "files": [(archive, "zeitnachweise.zip"), (io.BytesIO(b"kaputt"), "defekt.pdf")],
+        "overwrite": "true"
+    }, content_type='multipart/form-data')
+    assert res.status_code == 202
+
+    job = wait_for_job(client, res.get_json()["job_id"])
+    data = job["result"]
+    assert job["status"] == "done" and data["success"] is True
+    assert [f["month"] for f in data["files"] if f["success"]] == ["2034-06", "2034-07"]
+    assert next(f for f in data["files"] if f["file"] == "defekt.pdf")["success"] is False
+
+    with app.app_context():
+        assert WorkEntry.query.filter_by(date="2034-07-03", type="home").one().glz_override == 2.0
+        WorkEntry.query.filter(WorkEntry.date.startswith("2034-")).delete(synchronize_session=False)
+        db.session.commit()
+
+
+def test_batch_import_rejects_zip_bomb(client, monkeypatch):
+    """Prüft, dass entpackte ZIP-Inhalte über der Obergrenze abgelehnt werden, ohne sie ganz zu entpacken."""
+    import io
+    import zipfile
+    import app as app_module
+    monkeypatch.setattr(app_module, "UPLOAD_MAX_FILE_BYTES", 1024 * 1024)
+
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, 'w', zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr("bombe.pdf", b"\0" * (8 * 1024 * 1024))
+    archive.seek(0)
+    res = client.post('/api/import/batch', data={"files": [(archive, "bombe.zip")]}, content_type='multipart/form-data')
+    assert res.status_code == 413 and res.get_json()["success"] is False
+
+
+def test_pdf_import_runs_as_background_job(client):
+    """Prüft, dass der PDF-Upload sofort eine Job-ID liefert und der Job Fortschritt und Ergebnis meldet."""
+    import io
+    from pdf_factory import make_pdf
+
+    pdf = make_pdf("Monat: Mai 2035", [["Tag", "Status", "Kommen", "Gehen"], ["07 MO", "Mobil", "08:00", "12:00"]])
+    res = client.post('/api/import/pdf', data={"file": (io.BytesIO(pdf), "mai.pdf"), "overwrite": "false"},
+                      content_type='multipart/form-data')
+    assert res.status_code == 202
+
+    job = wait_for_job(client, res.get_json()["job_id"])
+    assert job["status"] == "done"
+    assert job["pages_done"] == job["pages_total"] == 1
+    assert job["result"]["files"][0]["inserted"] == 1
+
+    assert client.get('/api/jobs/gibtsnicht').status_code == 404
+
+    with app.app_context():
+        WorkEntry.query.filter(WorkEntry.date.startswith("2035-")).delete(synchronize_session=False)
+        db.session.commit()
+
+
+def test_stale_import_job_reported_without_write_in_get(client):
+    """Prüft: hängengebliebene Jobs meldet das GET als 'failed', festgeschrieben wird erst beim Aufräumen."""
+    from datetime import datetime, timedelta
+    from app import ImportJob, fail_stale_import_jobs, JOB_STALE_AFTER
+    with app.app_context():
+        job = ImportJob(id="stale-test", status="running")
+        db.session.add(job)
+        db.session.flush()
+        # onupdate würde updated_at beim ORM-Update neu setzen -> direkt per SQL zurückdatieren
+        ImportJob.query.filter_by(id="stale-test").update(
+            {"updated_at": datetime.now() - JOB_STALE_AFTER - timedelta(minutes=1)}, synchronize_session=False)
+        db.session.commit()
+
+    data = client.get('/api/jobs/stale-test').get_json()
+    assert data["status"] == "failed" and data["result"]["success"] is False
+    with app.app_context():
+        assert db.session.get(ImportJob, "stale-test").status == "running"
+        fail_stale_import_jobs()
+        db.session.commit()
+        assert db.session.get(ImportJob, "stale-test").status == "failed"
+        ImportJob.query.filter_by(id="stale-test").delete()
+        db.session.commit()
+
+
+def test_entry_delta_matches_month_view(client):
+    """Prüft, dass die Teil-Antwort beim Speichern/Löschen dieselben Werte liefert wie ein kompletter Monats-Reload."""
+    client.post('/api/entry', json={"date": "2036-03-02", "type": "home", "start": "08:00", "end": "12:00", "glz_override": 5.0})
+    # Weitere Tage der Woche (nur über die vorsummierten Tageswerte gerechnet)
+    client.post('/api/entry', json={"date": "2036-03-05", "type": "planned"})
+    client.post('/api/entry', json={"date": "2036-03-06", "type": "dr", "start": "08:00", "end": "15:10"})
+    client.post('/api/entry', json={"date": "2036-03-10", "type": "sick"})
+    res = client.post('/api/entry', json={"date": "2036-03-04", "type": "office", "start": "07:00", "end": "17:00", "delta": True})
+    data = res.get_json()
+    delta = data["delta"]
+
+    month = client.get('/api/month/2036/03').get_json()
+    day = next(i for i in month["items"] if i.get("date") == "2036-03-04")
+    week = next(i for i in month["items"] if i["row_type"] == "summary" and i["iso_week"] == day["iso_week"])
+    assert delta["day"] == day
+    assert delta["week"] == week
+    assert delta["stats"] == month["stats"]
+    assert delta["glz_tail"] == [{"date": i["date"], "glz_saldo": i["glz_saldo"]}
+                                 for i in month["items"] if i["row_type"] == "day" and i["date"] >= "2036-03-04"]
+
+    # Löschen liefert den Tag ohne Einträge und den zurückgesetzten Saldo-Verlauf
+    res = client.delete(f'/api/entry/{data["id"]}?delta=1')
+    delta = res.get_json()["delta"]
+    assert delta["day"]["entries"] == []
+    assert delta["glz_tail"][0]["glz_saldo"] == 5.0
+
+    with app.app_context():
+        WorkEntry.query.filter(WorkEntry.date.startswith("2036-")).delete(synchronize_session=False)
+        db.session.commit()
+
+
+def test_entry_delta_with_impossible_dates(client):
+    """Prüft: unmöglicher Tag mit delta wird vor dem Schreiben abgelehnt; Altbestand liefert Erfolg ohne Delta."""
+    res = client.post('/api/entry', json={"date": "2051-02-30", "type": "home", "start": "08:00", "end": "16:00", "delta": True})
+    assert res.status_code == 400
+    with app.app_context():
+        assert WorkEntry.query.filter(WorkEntry.date.startswith("2051-")).count() == 0
+        legacy = WorkEntry(date="2051-02-30", type="home", start_time="08:00", end_time="16:00")
+        db.session.add(legacy)
+        db.session.commit()
+        legacy_id = legacy.id
+
+    res = client.post('/api/entry', json={"id": legacy_id, "date": "2051-02-27", "type": "office", "start": "08:00", "end": "12:00", "delta": True})
+    assert res.status_code == 200 and "delta" not in res.get_json()
+    res = client.delete(f'/api/entry/{legacy_id}?delta=1')
+    assert res.status_code == 200 and res.get_json()["success"] is True and "delta" not in res.get_json()
+    with app.app_context():
+        assert WorkEntry.query.filter(WorkEntry.date.startswith("2051-")).count() == 0
+
+
+def test_batch_entries_single_transaction(client):
+    """Prüft Upserts und Löschungen über mehrere Tage in einem Request sowie das Verwerfen ungültiger Batches."""
+    first = client.post('/api/entry', json={"date": "2037-02-02", "type": "home", "start": "08:00", "end": "16:00"}).get_json()["id"]
+    second = client.post('/api/entry', json={"date": "2037-02-03", "type": "office", "start": "08:00", "end": "16:00"}).get_json()["id"]
+
+    res = client.post('/api/entries/batch', json={
+        "upserts": [
+            {"id": first, "date": "2037-02-02", "type": "home", "start": "0800", "end": "12:00"},
+            {"date": "2037-02-02", "type": "office", "start": "13:00", "end": "17:00"},
+            {"date": "2037-02-04", "type": "sick"},
+        ],
+        "deletes": [second]
+    })
+    data = res.get_json()
+    assert res.status_code == 200 and data["deleted"] == 1
+    assert data["ids"][0] == first and all(data["ids"])
+
+    with app.app_context():
+        entries = WorkEntry.query.filter(WorkEntry.date.startswith("2037-02")).order_by(WorkEntry.date, WorkEntry.start_time).all()
+        assert [(e.date, e.type, e.start_time, e.net_minutes) for e in entries] == [
+            ("2037-02-02", "home", "08:00", 240), ("2037-02-02", "office", "13:00", 240), ("2037-02-04", "sick", None, 0)]
+
+    # Eine ungültige Zeit verwirft den kompletten Batch
+    res = client.post('/api/entries/batch', json={"upserts": [
+        {"date": "2037-02-05", "type": "home", "start": "08:00", "end": "16:00"},
+        {"date": "2037-02-06", "type": "home", "start": "25:99"}]})
+    assert res.status_code == 400 and res.get_json()["index"] == 1
+    assert client.post('/api/entries/batch', json={"upserts": [{"id": 999999, "date": "2037-02-06", "type": "home"}]}).status_code == 404
+    # Unmöglicher Kalendertag -> ganzer Batch abgelehnt
+    res = client.post('/api/entries/batch', json={"upserts": [
+        {"date": "2037-02-05", "type": "home", "start": "08:00", "end": "16:00"},
+        {"date": "2037-02-30", "type": "home", "start": "08:00", "end": "16:00"}]})
+    assert res.status_code == 400 and res.get_json()["index"] == 1
+    # Ungültige IDs (Liste, String, bool) -> 400 statt Serverfehler
+    for bad_id in ([1], "1", True):
+        res = client.post('/api/entries/batch', json={"upserts": [{"id": bad_id, "date": "2037-02-06", "type": "home"}]})
+        assert res.status_code == 400 and res.get_json()["index"] == 0
+    with app.app_context():
+        assert WorkEntry.query.filter_by(date="2037-02-05").count() == 0
+        WorkEntry.query.filter(WorkEntry.date.startswith("2037-")).delete(synchronize_session=False)
+        db.session.commit()
+
+
+def test_planned_conversion_uses_daily_watermark(client):
+    """Prüft: Monatsansicht schreibt nicht mehr, der Tageslauf wandelt nur den neuen Bereich um, Schreiben in die Vergangenheit sofort."""
+    with app.app_context():
+        previous = get_app_state(PLANNED_WATERMARK_KEY)
+        set_app_state(PLANNED_WATERMARK_KEY, "2021-03-01")
+        db.session.add_all([WorkEntry(date="2021-03-01", type="planned"), WorkEntry(date="2021-03-02", type="planned")])
+        db.session.commit()
+
+    month = client.get('/api/month/2021/03').get_json()
+    assert next(i for i in month["items"] if i.get("date") == "2021-03-02")["entries"][0]["type"] == "planned"
+
+    with app.app_context():
+        run_planned_conversion(today=date(2021, 3, 3))
+        types = dict(db.session.query(WorkEntry.date, WorkEntry.type).filter(WorkEntry.date.startswith("2021-03")).all())
+        # 01.03. lag schon unter dem Wasserstand und wird nicht erneut angefasst
+        assert types == {"2021-03-01": "planned", "2021-03-02": "home"}
+        assert get_app_state(PLANNED_WATERMARK_KEY) == "2021-03-02"
+        converted = WorkEntry.query.filter_by(date="2021-03-02").first()
+        assert converted.start_time == "08:00" and converted.net_minutes > 0
+
+    # Direkt gespeicherte Planung in der Vergangenheit wird sofort umgewandelt
+    client.post('/api/entry', json={"date": "2021-03-04", "type": "planned"})
+    with app.app_context():
+        assert WorkEntry.query.filter_by(date="2021-03-04").first().type == "home"
+        set_app_state(PLANNED_WATERMARK_KEY, previous)
+        WorkEntry.query.filter(WorkEntry.date.startswith("2021-03")).delete(synchronize_session=False)
+        db.session.commit()
+
+
+def test_planned_conversion_ignores_impossible_dates(client):
+    """Prüft: geplante Einträge an unmöglichen Tagen werden abgelehnt; Altbestand bricht die Sofort-Konvertierung nicht."""
+    res = client.post('/api/entry', json={"date": "2021-02-30", "type": "planned"})
+    assert res.status_code == 400
+    with app.app_context():
+        legacy = WorkEntry(date="2021-02-30", type="home", start_time="08:00", end_time="16:00")
+        db.session.add(legacy)
+        db.session.commit()
+        legacy_id = legacy.id
+
+    res = client.post('/api/entry', json={"id": legacy_id, "date": "2021-02-27", "type": "planned"})
+    assert res.status_code == 200 and res.get_json()["success"] is True
+    with app.app_context():
+        WorkEntry.query.filter(WorkEntry.date.startswith("2021-02")).delete(synchronize_session=False)
+        db.session.commit()
+
+
+def test_config_snapshot_cached_until_version_bump(client):
+    """Prüft: Lesepfade fragen Settings/Feiertage nicht erneut ab, Änderungen erhöhen die Version und laden neu."""
+    client.get('/api/month/2038/05')
+    statements = []
+    def record(conn, cursor, statement, *args): statements.append(statement.lower())
+    with app.app_context(): engine = db.engine
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        client.get('/api/month/2038/05')
+        client.get('/api/year/2038')
+        client.get('/api/custom-holidays')
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    assert statements and not any("from settings" in s or "from custom_holiday" in s for s in statements)
+
+    with app.app_context(): before = get_app_state(CONFIG_VERSION_KEY)
+    client.post('/api/custom-holidays', json={"date": "2038-05-12", "name": "Betriebsausflug", "hours": 0})
+    with app.app_context():
+        assert get_app_state(CONFIG_VERSION_KEY) == str(int(before or 0) + 1)
+        assert any(h["name"] == "Betriebsausflug" for h in get_config().custom_holidays)
+    month = client.get('/api/month/2038/05').get_json()
+    assert next(i for i in month["items"] if i.get("date") == "2038-05-12")["holiday_name"] == "Betriebsausflug"
+
+    hol_id = next(h["id"] for h in client.get('/api/custom-holidays').get_json() if h["date"] == "2038-05-12")
+    client.delete(f'/api/custom-holidays/{hol_id}')
+    month = client.get('/api/month/2038/05').get_json()
+    assert next(i for i in month["items"] if i.get("date") == "2038-05-12")["holiday_name"] == ""
+
+
+def test_month_cache_etag_and_invalidation(client):
+    """Prüft ETag/304 und dass eine Änderung nur den betroffenen und alle späteren Monate neu berechnet."""
+    feb, mar, jan = (client.get(f'/api/month/2039/{m:02d}') for m in (2, 3, 1))
+    assert feb.headers['ETag'] and feb.headers['Cache-Control'] == 'no-cache'
+    assert client.get('/api/month/2039/02', headers={"If-None-Match": feb.headers['ETag']}).status_code == 304
+
+    client.post('/api/entry', json={"date": "2039-02-14", "type": "home", "start": "08:00", "end": "18:00"})
+    feb2 = client.get('/api/month/2039/02', headers={"If-None-Match": feb.headers['ETag']})
+    assert feb2.status_code == 200 and feb2.headers['ETag'] != feb.headers['ETag']
+    assert next(i for i in feb2.get_json()["items"] if i.get("date") == "2039-02-14")["total_net"] == 9.25
+    # GLZ-Übertrag: März ändert sich mit, Januar nicht
+    assert client.get('/api/month/2039/03', headers={"If-None-Match": mar.headers['ETag']}).status_code == 200
+    assert client.get('/api/month/2039/01', headers={"If-None-Match": jan.headers['ETag']}).status_code == 304
+
+    year = client.get('/api/year/2039')
+    assert client.get('/api/year/2039', headers={"If-None-Match": year.headers['ETag']}).status_code == 304
+
+    with app.app_context():
+        WorkEntry.query.filter(WorkEntry.date.startswith("2039-")).delete(synchronize_session=False)
+        db.session.commit()
+
+
+def test_bootstrap_matches_single_endpoints(client):
+    """Prüft, dass /api/bootstrap dieselben Daten liefert wie die Einzel-Endpunkte und mit ihnen invalidiert wird."""
+    boot = client.get('/api/bootstrap?year=2041&month=5&with_year=1')
+    data = boot.get_json()
+    assert data["settings"] == client.get('/api/settings').get_json()
+    assert data["custom_holidays"] == client.get('/api/custom-holidays').get_json()
+    assert data["month"] == client.get('/api/month/2041/05').get_json()
+    assert data["year"] == client.get('/api/year/2041').get_json()
+    assert client.get('/api/bootstrap?year=2041&month=5').get_json()["year"] is None
+    assert client.get('/api/bootstrap?year=2041&month=13').status_code == 400
+
+    etag = boot.headers['ETag']
+    assert client.get('/api/bootstrap?year=2041&month=5&with_year=1', headers={"If-None-Match": etag}).status_code == 304
+    # Änderung nach dem Monat betrifft die Jahresstatistik -> neue Antwort
+    client.post('/api/entry', json={"date": "2041-11-02", "type": "office", "start": "08:00", "end": "16:00"})
+    assert client.get('/api/bootstrap?year=2041&month=5&with_year=1', headers={"If-None-Match": etag}).status_code == 200
+
+    with app.app_context():
+        WorkEntry.query.filter(WorkEntry.date.startswith("2041-")).delete(synchronize_session=False)
+        db.session.commit()
+
+
+def test_sqlite_pragmas_applied_on_every_connection(client):
+    """Prüft, dass WAL, busy_timeout & Co. auch auf frisch geöffneten Pool-Verbindungen gesetzt sind."""
+    from sqlalchemy import text
+    with app.app_context():
+        with db.engine.connect() as conn:
+            assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+            assert conn.execute(text("PRAGMA synchronous")).scalar() == 1  # NORMAL
+            assert conn.execute(text("PRAGMA busy_timeout")).scalar() >= 1000
+            assert conn.execute(text("PRAGMA foreign_keys")).scalar() == 1
+
+
+def test_range_queries_use_date_type_index():
+    """Prüft per EXPLAIN QUERY PLAN, dass Monats-/Jahres-/Zeitraum-Abfragen den (date, type)-Index nutzen."""
+    from sqlalchemy import create_engine, select
+    from app import month_range, year_range, days_range, TYPE_CODES
+
+    engine = create_engine("sqlite://")
+    db.metadata.create_all(engine)
+    def plan(stmt):
+        sql = str(stmt.compile(engine, compile_kwargs={"literal_binds": True}))
+        with engine.connect() as conn:
+            return " | ".join(row[-1] for row in conn.exec_driver_sql("EXPLAIN QUERY PLAN " + sql))
+
+    statements = [
+        select(WorkEntry).where(month_range(2024, 12)).order_by(WorkEntry.date, WorkEntry.id),
+        select(WorkEntry.date, WorkEntry.type, func.count(WorkEntry.id)).where(year_range(2024), WorkEntry.type.in_(list(TYPE_CODES)))
+            .group_by(WorkEntry.date, WorkEntry.type),
+        select(WorkEntry.id, WorkEntry.date, WorkEntry.type).where(days_range(date(2024, 3, 1), date(2024, 3, 31))),
+    ]
+    for stmt in statements:
+        assert "INDEX ix_work_entry_date_type" in plan(stmt)
+    # Zum Vergleich: das frühere startswith/LIKE kann keinen Index nutzen
+    assert "INDEX" not in plan(select(WorkEntry).where(WorkEntry.date.startswith("2024-12")))
+
+
+def test_month_view_keeps_entries_in_insertion_order(client):
+    """Prüft, dass Einträge eines Tages in Erfassungsreihenfolge kommen (nicht nach Typ sortiert über den Index)."""
+    for payload in ({"date": "2044-02-03", "type": "office", "start": "08:00", "end": "12:00"},
+                    {"date": "2044-02-03", "type": "home", "start": "13:00", "end": "16:00"},
+                    {"date": "2044-02-04", "type": "vacation"},
+                    {"date": "2044-02-04", "type": "", "comment": "Notiz"}):
+        assert client.post('/api/entry', json=payload).get_json()["success"] is True
+
+    items = {i["date"]: i for i in client.get('/api/month/2044/02').get_json()["items"] if i.get("date")}
+    assert [e["type"] for e in items["2044-02-03"]["entries"]] == ["office", "home"]
+    assert [e["type"] for e in items["2044-02-04"]["entries"]] == ["vacation", ""]
+
+    with app.app_context():
+        WorkEntry.query.filter(WorkEntry.date.startswith("2044-")).delete(synchronize_session=False)
+        db.session.commit()
+
+
+def test_plan_series_dry_run_matches_applied_result(client):
+    """Prüft Serienplanung: Feiertage/eigene Feiertage werden übersprungen, Dry-Run schreibt nichts und sagt HO/GLZ korrekt voraus."""
+    client.post('/api/entry', json={"date": "2040-03-06", "type": "office", "start": "08:00", "end": "12:00", "glz_override": 4.0})
+    client.post('/api/entry', json={"date": "2040-04-10", "type": "home", "start": "08:00", "end": "18:00"})
+    client.post('/api/custom-holidays', json={"date": "2040-04-11", "name": "Brückentag", "hours": 0})
+    payload = {"start": "2040-03-01", "end": "2040-04-30", "weekdays": [1, 2], "type": "planned", "overwrite": True}
+
+    preview = client.post('/api/plan/series', json=dict(payload, dry_run=True)).get_json()
+    assert preview["dry_run"] is True
+    assert preview["overwrite"] == ["2040-03-06", "2040-04-10"]
+    assert "2040-04-11" not in preview["create"]            # eigener Feiertag
+    assert "2040-04-03" in preview["create"] and "2040-04-04" in preview["create"]
+    with app.app_context():
+        assert WorkEntry.query.filter(WorkEntry.date.startswith("2040-"), WorkEntry.type == "planned").count() == 0
+
+    res = client.post('/api/plan/series', json=payload).get_json()
+    assert res["created"] == len(preview["create"]) and res["overwritten"] == 2
+    for impact in preview["impact"]:
+        year, month = impact["month"].split("-")
+        stats = client.get(f'/api/month/{year}/{month}').get_json()["stats"]
+        assert stats["total_ho_made"] == impact["ho_made_after"]
+        assert stats["total_ho_allowed"] == impact["ho_allowed"]
+        assert stats["current_glz"] == impact["glz_end_after"]
+    assert preview["impact"][0]["glz_end"] != preview["impact"][0]["glz_end_after"]
+
+    with app.app_context():
+        WorkEntry.query.filter(WorkEntry.date.startswith("2040-")).delete(synchronize_session=False)
+        CustomHoliday.query.filter(CustomHoliday.date.startswith("2040-")).delete(synchronize_session=False)
+        db.session.commit()
+
+
+def test_change_log_records_writes_for_delta_sync(client):
+    """Prüft, dass schreibende Routen ins Änderungsprotokoll schreiben und /api/changes den Stand seit seq liefert."""
+    base = client.get('/api/changes').get_json()
+    assert base["reset"] is True and base["changes"] == []
+
+    entry_id = client.post('/api/entry', json={"date": "2042-05-04", "type": "home", "start": "08:00", "end": "16:00"}).get_json()["id"]
+    client.post('/api/entry', json={"id": entry_id, "date": "2042-05-04", "type": "office", "start": "08:00", "end": "16:00"})
+    client.post('/api/plan/series', json={"start": "2042-03-02", "end": "2042-03-06", "weekdays": [0], "type": "vacation"})
+    client.delete(f'/api/entry/{entry_id}')
+
+    data = client.get(f'/api/changes?since={base["seq"]}').get_json()
+    ops = [(c["table"], c["op"], c["date"]) for c in data["changes"]]
+    assert ops == [("work_entry", "insert", "2042-05-04"), ("work_entry", "update", "2042-05-04"),
+                   ("work_entry", "insert", "2042-03-03"), ("work_entry", "delete", "2042-05-04")]
+    assert data["changes"][0]["row_id"] == entry_id and data["changes"][2]["row_id"] is not None
+    assert data["stale_from"] == "2042-03" and data["reset"] is False and data["more"] is False
+
+    # Nichts Neues -> gleicher Stand; Settings betreffen alle Monate
+    assert client.get(f'/api/changes?since={data["seq"]}').get_json() == dict(data, changes=[], stale_from=None)
+    client.post('/api/settings', json=client.get('/api/settings').get_json())
+    assert client.get(f'/api/changes?since={data["seq"]}').get_json()["stale_from"] == "0000-00"
+    # Unbekannter (z.B. nach Restore) Stand -> Cache verwerfen
+    assert client.get(f'/api/changes?since={data["seq"] + 1000}').get_json()["reset"] is True
+
+    with app.app_context():
+        WorkEntry.query.filter(WorkEntry.date.startswith("2042-")).delete(synchronize_session=False)
+        db.session.commit()
+
+
+def test_event_stream_pushes_invalidations_across_writes(client, monkeypatch):
+    """Prüft den SSE-Stream: hello mit aktuellem Stand, dann 'invalidate' ab dem geänderten Monat."""
+    # Kein Poll-Thread: der Test ruft poll() selbst auf, damit Reihenfolge und Zeitpunkt feststehen
+    monkeypatch.setattr(notifier, 'thread', object())
+    monkeypatch.setattr(notifier, 'seq', None)
+    monkeypatch.setattr(notifier, 'recent', deque(maxlen=256))
+    notifier.poll()
+
+    res = client.get('/api/events', buffered=False)
+    assert res.mimetype == 'text/event-stream' and res.headers['Cache-Control'] == 'no-store'
+    stream = iter(res.response)
+    hello = next(stream).decode()
+    assert hello.startswith('retry: ') and 'event: hello' in hello
+
+    # Schreiben über einen zweiten Client - der Stream erfährt es nur über das Protokoll in SQLite
+    with app.test_client() as other:
+        written = other.post('/api/entry', json={"date": "2043-07-01", "type": "home", "start": "08:00", "end": "16:00"}).get_json()
+    notifier.poll()
+    event = next(stream).decode()
+    assert 'event: invalidate' in event and '"stale_from": "2043-07"' in event
+    seq = int(event.split('id: ')[1].split('\n')[0])
+    # Der schreibende Tab erkennt das Event an der seq aus seiner Antwort
+    assert written["change_seqs"] == [[seq, seq]]
+    res.close()
+    assert notifier.subscribers == 0
+
+    # Wiederaufnahme mit älterer Last-Event-ID liefert das Verpasste sofort
+    res = client.get('/api/events', headers={"Last-Event-ID": str(seq - 1)}, buffered=False)
+    stream = iter(res.response)
+    assert f'id: {seq - 1}' in next(stream).decode()
+    assert f'id: {seq}\nevent: invalidate' in next(stream).decode()
+    res.close()
+
+    with app.app_context():
+        WorkEntry.query.filter(WorkEntry.date.startswith("2043-")).delete(synchronize_session=False)
+        db.session.commit()
+
+
+def test_write_responses_report_own_change_seqs(client):
+    """Prüft, dass schreibende Routen genau die seq-Bereiche ihrer committeten Protokollzeilen zurückgeben."""
+    base = client.get('/api/changes').get_json()["seq"]
+    first = client.post('/api/entry', json={"date": "2045-02-01", "type": "home", "start": "08:00", "end": "16:00"}).get_json()
+    batch = client.post('/api/entries/batch', json={
+        "upserts": [{"date": "2045-02-02", "type": "office", "start": "08:00", "end": "12:00"},
+                    {"date": "2045-02-03", "type": "sick"}],
+        "deletes": [first["id"]]}).get_json()
+    holiday = client.post('/api/custom-holidays', json={"date": "2045-02-06", "name": "Test", "hours": 0}).get_json()
+    # Ungültige Anfragen schreiben nichts und melden keine seqs
+    assert "change_seqs" not in client.post('/api/entries/batch', json={"upserts": [{"date": "2045-02-04", "type": "x"}]}).get_json()
+
+    seqs = [c["seq"] for c in client.get(f'/api/changes?since={base}').get_json()["changes"]]
+    assert first["change_seqs"] == [[seqs[0], seqs[0]]]
+    # Batch: Löschung und Einfügungen als eigene Bereiche, zusammen lückenlos
+    assert [s for lo, hi in batch["change_seqs"] for s in range(lo, hi + 1)] == seqs[1:4]
+    assert holiday["change_seqs"] == [[seqs[4], seqs[4]]]
+
+    with app.app_context():
+        WorkEntry.query.filter(WorkEntry.date.startswith("2045-")).delete(synchronize_session=False)
+        CustomHoliday.query.filter(CustomHoliday.date.startswith("2045-")).delete(synchronize_session=False)
+        db.session.commit()
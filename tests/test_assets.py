@@ -0,0 +1,86 @@
+import gzip
+import pytest
+from app import app
+from assets import build_vendor, localize_html, select_variant
+
+FONT_CSS_URL = 'https://cdn.example/font@1.0/css/icons.min.css'
+VUE_URL = 'https://cdn.example/vue@3.4.38/dist/vue.global.prod.js'
+
+FAKE_CDN = {
+    FONT_CSS_URL: b'@font-face{src:url("../fonts/icons.woff2?v=1.0") format("woff2"),url(data:font/x;base64,AA==)}',
+    'https://cdn.example/font@1.0/fonts/icons.woff2?v=1.0': b'wOF2-binary',
+    VUE_URL: b'/* vue */' + b'var Vue={};' * 200,
+}
+
+
+@pytest.fixture
+def vendor(tmp_path):
+    manifest = build_vendor(str(tmp_path), urls=(FONT_CSS_URL, VUE_URL), fetch=FAKE_CDN.__getitem__)
+    app.config['VENDOR_DIR'] = str(tmp_path)
+    yield tmp_path, manifest
+    app.config.pop('VENDOR_DIR')
+
+
+def test_build_vendor_hashes_rewrites_and_precompresses(vendor):
+    vendor_dir, manifest = vendor
+    vue_name, css_name = manifest[VUE_URL], manifest[FONT_CSS_URL]
+    assert vue_name.startswith('vue.global.prod.') and vue_name.endswith('.js')
+    assert gzip.decompress((vendor_dir / (vue_name + '.gz')).read_bytes()) == FAKE_CDN[VUE_URL]
+
+    css = (vendor_dir / css_name).read_text()
+    font_name = next(p.name for p in vendor_dir.iterdir() if p.name.endswith('.woff2'))
+    assert f'url({font_name})' in css and 'url(data:' in css
+    # woff2 ist schon komprimiert -> keine Varianten
+    assert not (vendor_dir / (font_name + '.gz')).exists()
+
+    # Neuer Build räumt verwaiste Hashes ab
+    (vendor_dir / 'vue.global.prod.deadbeef.js').write_bytes(b'alt')
+    build_vendor(str(vendor_dir), urls=(VUE_URL,), fetch=FAKE_CDN.__getitem__)
+    assert not (vendor_dir / 'vue.global.prod.deadbeef.js').exists() and not (vendor_dir / css_name).exists()
+    assert (vendor_dir / vue_name).exists() and (vendor_dir / (vue_name + '.gz')).exists()
+
+
+def test_select_variant_and_localize(tmp_path):
+    (tmp_path / 'a.js').write_bytes(b'x')
+    (tmp_path / 'a.js.gz').write_bytes(b'x')
+    assert select_variant(str(tmp_path), 'a.js', 'gzip, deflate, br') == ('a.js.gz', 'gzip')
+    assert select_variant(str(tmp_path), 'a.js', 'identity') == ('a.js', None)
+    html = '<script src="https://x/a.js?x=1&amp;y=2"></script>'
+    assert localize_html(html, {'https://x/a.js?x=1&y=2': 'a.123.js'}) == '<script src="/assets/a.123.js"></script>'
+
+
+def test_index_and_assets_served_from_vendor(vendor):
+    vendor_dir, manifest = vendor
+    vue_name = manifest[VUE_URL]
+    with app.test_client() as client:
+        res = client.get('/assets/' + vue_name, headers={'Accept-Encoding': 'gzip'})
+        assert res.status_code == 200
+        assert res.headers['Content-Encoding'] == 'gzip'
+        assert res.headers['Cache-Control'] == 'public, max-age=31536000, immutable'
+        assert res.headers['Vary'] == 'Accept-Encoding'
+        assert res.mimetype in ('text/javascript', 'application/javascript')
+        assert gzip.decompress(res.data) == FAKE_CDN[VUE_URL]
+
+        plain = client.get('/assets/' + vue_name)
+        assert 'Content-Encoding' not in plain.headers and plain.data == FAKE_CDN[VUE_URL]
+        assert client.get('/assets/nicht-da.js').status_code == 404
+
+        # index.html enthält die echten CDN-URLs aus assets.VENDOR_ASSETS, nicht die Test-URLs ->
+        # Seite bleibt ausliefer- und revalidierbar
+        page = client.get('/', headers={'Accept-Encoding': 'gzip'})
+        assert page.headers['Content-Encoding'] == 'gzip' and page.headers['Cache-Control'] == 'no-cache'
+        assert b'Home Office Planer' in gzip.decompress(page.data)
+        assert client.get('/', headers={'If-None-Match': page.headers['ETag']}).status_code == 304
+
+
+def test_index_uses_local_paths_when_manifest_matches(tmp_path):
+    from assets import VENDOR_ASSETS
+    build_vendor(str(tmp_path), urls=VENDOR_ASSETS, fetch=lambda url: b'/* ' + url.encode() + b' */')
+    app.config['VENDOR_DIR'] = str(tmp_path)
+    try:
+        with app.test_client() as client:
+            html = client.get('/').get_data(as_text=True)
+        assert 'unpkg.com' not in html and 'cdn.jsdelivr.net' not in html and 'fonts.googleapis.com' not in html
+        assert '/assets/vue.global.prod.' in html and '/assets/chart.umd.min.' in html
+    finally:
+        app.config.pop('VENDOR_DIR')
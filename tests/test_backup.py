@@ -0,0 +1,94 @@
+import os
+import zlib
+import sqlite3
+import time
+from datetime import date
+from backup import run_daily_backup, prune_backups, backup_lock, list_snapshots, load_manifest, verify_snapshot, main
+
+
+def make_db(path, rows=100):
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE t (x INTEGER)")
+    conn.executemany("INSERT INTO t VALUES (?)", [(i,) for i in range(rows)])
+    conn.commit()
+    conn.close()
+
+
+def test_daily_backup_dedupes_chunks_and_restores(tmp_path):
+    db_path, backup_dir = str(tmp_path / "db.sqlite"), tmp_path / "backups"
+    backup_dir.mkdir()
+    make_db(db_path, rows=20000)
+
+    first = run_daily_backup(db_path, str(backup_dir), today=date(2026, 3, 1))
+    assert first["new_chunks"] == len(first["chunks"]) > 2
+    # Zweiter Lauf am selben Tag tut nichts
+    assert run_daily_backup(db_path, str(backup_dir), today=date(2026, 3, 1)) is None
+
+    conn = sqlite3.connect(db_path)
+    conn.execute("UPDATE t SET x = -1 WHERE x = 5")
+    conn.commit()
+    conn.close()
+    second = run_daily_backup(db_path, str(backup_dir), today=date(2026, 3, 2))
+    # Nur Kopfseite und geänderte Seite landen neu im Store
+    assert 1 <= second["new_chunks"] < len(second["chunks"])
+    assert list_snapshots(str(backup_dir)) == ["2026-03-01", "2026-03-02"]
+
+    for day, expected in (("2026-03-01", 5), ("2026-03-02", -1)):
+        target = tmp_path / f"restored-{day}.sqlite"
+        assert main(["--dir", str(backup_dir), "restore", day, str(target)]) == 0
+        conn = sqlite3.connect(str(target))
+        assert conn.execute("SELECT x FROM t WHERE rowid = 6").fetchone()[0] == expected
+        conn.close()
+    assert [p.name for p in backup_dir.iterdir() if p.name.endswith('.tmp')] == []
+
+
+def test_verify_detects_damaged_chunk(tmp_path):
+    db_path = str(tmp_path / "db.sqlite")
+    make_db(db_path)
+    manifest = run_daily_backup(db_path, str(tmp_path), today=date(2026, 3, 1))
+    assert verify_snapshot(str(tmp_path), "2026-03-01") == []
+    assert main(["--dir", str(tmp_path), "verify"]) == 0
+
+    chunk = tmp_path / "chunks" / manifest["chunks"][0][:2] / manifest["chunks"][0]
+    chunk.write_bytes(zlib.compress(b"kaputt"))
+    assert "beschädigt" in verify_snapshot(str(tmp_path), "2026-03-01")[0]
+    assert main(["--dir", str(tmp_path), "verify", "2026-03-01"]) == 1
+    assert main(["--dir", str(tmp_path), "restore", "2026-03-01", str(tmp_path / "out.sqlite")]) == 1
+    assert not (tmp_path / "out.sqlite").exists()
+
+
+def test_backup_skipped_while_other_process_holds_lock(tmp_path):
+    db_path = str(tmp_path / "db.sqlite")
+    make_db(db_path)
+    with backup_lock(str(tmp_path)) as acquired:
+        assert acquired
+        with backup_lock(str(tmp_path)) as second:
+            # flock gilt pro geöffneter Datei -> auch im selben Prozess blockiert
+            assert second is False
+            assert run_daily_backup(db_path, str(tmp_path), today=date(2026, 3, 2)) is None
+
+
+def test_prune_backups_keeps_retention_window(tmp_path):
+    db_path = str(tmp_path / "db.sqlite")
+    make_db(db_path)
+    old_manifest = run_daily_backup(db_path, str(tmp_path), today=date(2024, 1, 1))
+    legacy, other = tmp_path / "db_backup_2024-01-01.db", tmp_path / "notes.txt"
+    for p in (legacy, other):
+        p.write_text("x")
+        os.utime(p, (time.time() - 400 * 86400,) * 2)
+
+    conn = sqlite3.connect(db_path)
+    conn.execute("DELETE FROM t")
+    conn.commit()
+    conn.close()
+    today = date.today()
+    # Das heutige Backup räumt direkt alles jenseits von 180 Tagen ab
+    run_daily_backup(db_path, str(tmp_path), today=today)
+    assert list_snapshots(str(tmp_path)) == [str(today)]
+    assert not legacy.exists() and other.exists()
+
+    # Nur noch vom alten Snapshot genutzte Blöcke werden entfernt, der Rest bleibt wiederherstellbar
+    orphaned = set(old_manifest["chunks"]) - set(load_manifest(str(tmp_path), str(today))["chunks"])
+    assert orphaned and not any((tmp_path / "chunks" / c[:2] / c).exists() for c in orphaned)
+    assert verify_snapshot(str(tmp_path), str(today)) == []
+    assert prune_backups(str(tmp_path), today=today) == []
@@ -1,6 +1,8 @@
 import pytest
-from datetime import date
-from logic import normalize_time_str, calculate_net_hours, calculate_gross_time_needed, get_day_info
+from datetime import date, timedelta
+from logic import normalize_time_str, calculate_net_hours, calculate_gross_time_needed, get_day_info, calculate_glz_delta
+from logic import get_holiday_calendar, get_year_calendar, aggregate_year, TYPE_CODES, FLAG_SHORT_DAY, FLAG_OFF_DAY
+from logic import calculate_net_minutes, parse_time_minutes, net_minutes_batch, gross_minutes_needed
 
 # --- Mocks & Helper Classes ---
 # Wir simulieren die Datenbank-Klassen, damit wir keine echte DB brauchen
@@ -85,6 +87,22 @@ def test_normalize_time_invalid(input_str):
 def test_calculate_net_hours(start, end, expected_net):
     assert calculate_net_hours(start, end) == expected_net
 
+
+def test_net_minutes_kernel_and_batch_agree():
+    """Minuten-Kernel, Einzel- und Batch-Variante liefern für alle Präsenzdauern dasselbe wie die Stunden-API."""
+    assert parse_time_minutes("8.30") == 510 and parse_time_minutes("25:00") is None and parse_time_minutes("-1:00") is None
+    starts = [480] * 1440 + [-1, 480]
+    ends = [(480 + d) % 1440 for d in range(1440)] + [600, -1]
+    batch = net_minutes_batch(starts, ends)
+    assert list(batch[-2:]) == [0, 0]
+    for d in range(1440):
+        start, end = "08:00", f"{ends[d] // 60:02d}:{ends[d] % 60:02d}"
+        assert batch[d] == calculate_net_minutes(start, end)
+        assert calculate_net_hours(start, end) == round(batch[d] / 60, 2)
+    # Umkehrung: Brutto für ein Netto-Ziel ergibt wieder genau das Ziel
+    for target in range(0, 700):
+        assert net_minutes_batch([0], [gross_minutes_needed(target)])[0] == target
+
 # --- 3. Tests für calculate_gross_time_needed ---
 
 @pytest.mark.parametrize("target_net, expected_gross", [
@@ -193,4 +211,93 @@ def test_day_info_part_time_model():
     # Test Arbeitstag Mittwoch
     info_work = get_day_info(d_work, settings, he_holidays, custom_map)
     assert info_work["is_workday"] is True
-    assert info_work["target"] == 8.0 # 24h / 3 Tage
\ No newline at end of file
+    assert info_work["target"] == 8.0 # 24h / 3 Tage
+
+
+# --- 5. Tests für calculate_glz_delta ---
+
+@pytest.mark.parametrize("is_workday, day_types, day_net, expected", [
+    (True, ['home'], 8.0, 0.2),          # Normaler Arbeitstag: Netto - Soll
+    (True, [], 0.0, 0.0),                # Leerer Tag belastet GLZ nicht
+    (True, [''], 0.0, 0.0),              # Nur leere Einträge
+    (True, ['vacation'], 0.0, 0.0),      # Urlaub: Soll gilt als erfüllt
+    (True, ['glz'], 0.0, -7.8),          # Gleitzeittag: Soll wird abgezogen
+    (False, ['office'], 4.0, 4.0),       # Wochenende: alles ist Plus
+])
+def test_calculate_glz_delta(is_workday, day_types, day_net, expected):
+    target = 7.8 if is_workday else 0.0
+    assert calculate_glz_delta(is_workday, target, day_types, day_net) == pytest.approx(expected)
+
+
+# --- 6. Tests für den Feiertags-Cache ---
+
+def test_holiday_calendar_contains_hessian_and_special_days():
+    cal = get_holiday_calendar(2024)
+    assert date(2024, 5, 30) in cal            # Fronleichnam (nur in Hessen u.a.)
+    assert cal[date(2024, 12, 24)] == "Heiligabend"
+    assert cal[date(2024, 12, 31)] == "Silvester"
+    assert date(2024, 10, 31) not in cal       # Reformationstag gilt nicht in Hessen
+
+
+def test_holiday_calendar_is_cached_and_frozen():
+    assert get_holiday_calendar(2025) is get_holiday_calendar(2025)
+    with pytest.raises(TypeError):
+        get_holiday_calendar(2025)[date(2025, 3, 3)] = "Rosenmontag"
+
+
+# --- 7. Tests für den kompilierten Jahreskalender ---
+
+def test_year_calendar_matches_get_day_info():
+    settings = MockSettings(weekly_hours=32.0, active_weekdays="0,1,2,3")
+    custom_map = {date(2024, 6, 14): MockCustomHoliday("Wäldchestag", 4.0),
+                  date(2024, 8, 2): MockCustomHoliday("Betriebsausflug", 0.0)}
+    cal = get_year_calendar(2024, settings, custom_map)
+    he_holidays = get_holiday_calendar(2024)
+
+    d = date(2024, 1, 1)
+    while d.year == 2024:
+        i, info = cal.index(d), get_day_info(d, settings, he_holidays, custom_map)
+        assert cal.targets[i] == info["target"] and cal.holiday_names[i] == info["holiday_name"]
+        assert cal.is_workday(i) == info["is_workday"]
+        assert bool(cal.flags[i] & FLAG_SHORT_DAY) == info["is_short_day"] and bool(cal.flags[i] & FLAG_OFF_DAY) == info["is_off_day"]
+        d += timedelta(days=1)
+    assert len(cal.targets) == 366
+
+
+def test_year_calendar_cache_follows_settings_and_holidays():
+    settings = MockSettings()
+    cal = get_year_calendar(2023, settings, {})
+    assert get_year_calendar(2023, MockSettings(), {}) is cal
+
+    # Geänderte Wochenstunden oder neue eigene Feiertage erzeugen einen neuen Kalender
+    assert get_year_calendar(2023, MockSettings(weekly_hours=40.0), {}) is not cal
+    custom_map = {date(2023, 5, 30): MockCustomHoliday("Wäldchestag", 6.0)}
+    assert get_year_calendar(2023, settings, custom_map) is not cal
+    # Feiertage anderer Jahre spielen keine Rolle
+    assert get_year_calendar(2023, settings, {date(2022, 5, 30): MockCustomHoliday("X", 0.0)}) is cal
+
+
+# --- 8. Tests für die Jahres-Aggregation ---
+
+def test_aggregate_year_counts_hours_and_distinct_days():
+    cal = get_year_calendar(2023, MockSettings(weekly_hours=40.0), {})
+    rows = [
+        (date(2023, 3, 6), 'home', 4.0),      # Split-Tag: HO + Büro am selben Tag
+        (date(2023, 3, 6), 'office', 4.0),
+        (date(2023, 3, 7), 'planned', 8.0),   # Geplant zählt mit dem Tagessoll
+        (date(2023, 3, 8), 'dr', 9.0),
+        (date(2023, 3, 9), 'vacation', 0.0),
+        (date(2023, 3, 11), 'vacation', 0.0), # Samstag -> kein Urlaubstag
+        (date(2023, 4, 3), 'sick', 0.0),      # Zählt nirgends
+    ]
+    day_idx = [cal.index(d) for d, _, _ in rows]
+    codes = [TYPE_CODES.get(t, 0) for _, t, _ in rows]
+    nets = [n for _, _, n in rows]
+
+    data = aggregate_year(cal, day_idx, codes, nets, 50)
+    march = data[2]
+    assert march["month"] == 3
+    assert march["days_ho"] == 2 and march["days_office"] == 2 and march["days_vacation"] == 1
+    assert march["ho_hours_made"] == 12.0 and march["office_hours_made"] == 13.0
+    assert march["workdays"] == 23 and march["ho_hours_allowed"] == 92.0
+    assert data[3]["days_ho"] == 0 and data[3]["days_vacation"] == 0
@@ -1,7 +1,8 @@
 import pytest
 import os
 from datetime import date
-from app import parse_pdf_content 
+from app import parse_pdf_content
+from pdf_parser import ParseCache, classify_row
 
 PRIVATE_DIR = os.path.join(os.path.dirname(__file__), "testfiles")
 
@@ -84,4 +85,38 @@ def test_pdf_import_error_handling():
     entry_13_feb = next((e for e in results if e['date'] == date(2026, 2, 13)), None)
     
     assert entry_13_feb is not None
-    assert "fehlt" in (entry_13_feb.get('comment') or "").lower()
\ No newline at end of file
+    assert "fehlt" in (entry_13_feb.get('comment') or "").lower()
+
+
+def test_parse_cache_roundtrip_and_eviction(tmp_path):
+    """
+    Szenario D: Parse-Cache
+    Prüft: Ergebnisse werden über den Inhalt gefunden, Datumswerte bleiben erhalten, älteste Einträge werden verdrängt.
+    """
+    entries = [{'date': date(2025, 6, 2), 'type': 'home', 'start': '07:40', 'end': '16:30', 'comment': '', 'glz_override': 3.25}]
+    cache = ParseCache(str(tmp_path), max_bytes=10_000)
+
+    assert cache.get(b"pdf-a") is None
+    cache.put(b"pdf-a", entries)
+    assert cache.get(b"pdf-a") == entries
+    assert cache.get(b"pdf-b") is None
+
+    # Sehr kleines Limit: nur der zuletzt geschriebene Eintrag bleibt übrig
+    small = ParseCache(str(tmp_path / "small"), max_bytes=200)
+    small.put(b"pdf-a", entries)
+    os.utime(next((tmp_path / "small").iterdir()), (0, 0))
+    small.put(b"pdf-b", entries)
+    assert small.get(b"pdf-a") is None
+    assert small.get(b"pdf-b") == entries
+
+
+def test_classify_row_precedence():
+    """
+    Szenario E: Zeilen-Klassifikation
+    Prüft: Summenzeilen beenden den Tag, der letzte Typ-Schlüssel gewinnt, reine 00:00-Zeiten und Saldo-Erkennung.
+    """
+    assert classify_row(["Wochensumme", "38:30"]) is False
+    assert classify_row(["02 MO", "Telearb.", "07:40", "16:30", "3,25"]) == (2, 'home', ['07:40', '16:30'], 3.25)
+    # "Reise" steht in TYPE_MAP hinter "Mobil" und hat daher Vorrang
+    assert classify_row(["05 DO", "Mobil Reise", "00:00", "00:00", "1234,56"]) == (5, 'dr', [], None)
+    assert classify_row(["", "BUCHUNG FEHLT", "-1,50"]) == (None, 'missing', [], None)